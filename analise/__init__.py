@@ -0,0 +1 @@
+"""Camada compartilhada de dados e análises usada pelas páginas do painel."""
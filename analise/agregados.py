@@ -0,0 +1,163 @@
+"""Agregados combináveis por estação, período e coluna numérica.
+
+Para cada célula (estação, coluna) de uma partição guardamos contagem,
+soma, soma dos quadrados, mínimo, máximo e alguns quantis. Os agregados
+de uma partição nova são calculados só sobre ela; médias, somas, extremos,
+intervalos de confiança e testes t passam a ser consultas a esse cubo em
+vez de novas varreduras dos dados brutos. Os quantis não se combinam:
+ao juntar partições, os das células que recebem amostras de mais de uma
+delas são recalculados sobre os dados dessas células (quantis_pendentes).
+"""
+import numpy as np
+import pandas as pd
+
+from analise.instrumentacao import medido
+
+ESTATISTICAS = {
+    'n': 'sum',
+    'soma': 'sum',
+    'soma_quadrados': 'sum',
+    'minimo': 'min',
+    'maximo': 'max'
+}
+
+# Quantis guardados em cada célula do cubo
+QUANTIS = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def _nome_quantil(q):
+    return f"q{round(q * 100):02d}"
+
+
+def agregar(df, chave, colunas, quantis=()):
+    """Agregados de cada coluna numérica por valor de chave.
+
+    Retorna um quadro indexado (e ordenado) por (coluna, chave) com as
+    colunas de ESTATISTICAS e, se pedidos, os quantis (q05, q25, ...).
+    """
+    # Acumula em float64 mesmo que as medições estejam em float32
+    valores = df[colunas].astype(np.float64)
+    grupos = valores.groupby(df[chave], observed=True)
+    partes = {
+        'n': grupos.count(),
+        'soma': grupos.sum(),
+        'soma_quadrados': (valores ** 2).groupby(df[chave], observed=True).sum(),
+        'minimo': grupos.min(),
+        'maximo': grupos.max()
+    }
+    if quantis:
+        # Todos os quantis numa só chamada: os grupos são ordenados uma vez
+        todos = grupos.quantile(list(quantis))
+        for q in quantis:
+            partes[_nome_quantil(q)] = todos.xs(q, level=-1)
+    agregados = pd.DataFrame({nome: parte.stack(future_stack=True) for nome, parte in partes.items()})
+    agregados.index.names = [chave, 'coluna']
+    agregados = agregados.swaplevel().sort_index()
+    return agregados[agregados['n'] > 0]
+
+
+def combinar(*agregados):
+    """Combina agregados de partições diferentes.
+
+    Os quantis de uma célula presente em uma só das partes são mantidos;
+    nas células que juntam várias partes eles ficam NaN (ver
+    quantis_pendentes).
+    """
+    agregados = [a for a in agregados if a is not None]
+    if len(agregados) == 1:
+        return agregados[0]
+    juntos = pd.concat(agregados)
+    grupos = juntos.groupby(level=list(range(juntos.index.nlevels)), sort=True)
+    combinados = grupos[list(ESTATISTICAS)].agg(ESTATISTICAS)
+    quantis = [c for c in juntos.columns if c not in ESTATISTICAS]
+    if quantis:
+        combinados[quantis] = grupos[quantis].first().where(grupos.size() == 1)
+    return combinados
+
+
+def quantis_pendentes(agregados):
+    """Células (coluna, chave) cujos quantis precisam ser recalculados após combinar"""
+    quantis = [c for c in agregados.columns if c not in ESTATISTICAS]
+    if not quantis:
+        return agregados.index[:0]
+    return agregados.index[agregados[quantis].isna().all(axis=1)]
+
+
+def somar(agregados):
+    """Reduz várias células de agregados a uma só (ex.: um grupo de estações)"""
+    return agregados[list(ESTATISTICAS)].agg(ESTATISTICAS)
+
+
+def descontar(total, agregados):
+    """Agregados do restante: total (saída de somar) menos cada célula.
+
+    Só contagem, soma e soma dos quadrados se descontam; os extremos ficam de
+    fora do resultado.
+    """
+    aditivas = ['n', 'soma', 'soma_quadrados']
+    return total[aditivas] - agregados[aditivas]
+
+
+def resumir(agregados):
+    """Média, variância amostral e desvio padrão a partir dos agregados.
+
+    Aceita um quadro de células ou uma única célula (saída de somar).
+    """
+    n = agregados['n']
+    media = agregados['soma'] / n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variancia = (agregados['soma_quadrados'] - n * media ** 2) / (n - 1)
+    resumo = {'media': media, 'variancia': variancia, 'desvio_padrao': np.sqrt(variancia)}
+    if isinstance(agregados, pd.Series):
+        return pd.concat([agregados, pd.Series(resumo)])
+    return agregados.assign(**resumo)
+
+
+def estatistica(agregados, nome):
+    """Uma estatística por célula: 'media', 'soma', 'maximo', 'minimo', 'n' ou um quantil"""
+    if nome == 'media':
+        return agregados['soma'] / agregados['n']
+    return agregados[nome]
+
+
+def por_estacao(agregados, coluna, nome):
+    """Uma estatística de uma coluna para cada estação (consulta ao cubo)"""
+    try:
+        linhas = agregados.loc[coluna]
+    except KeyError:
+        return pd.Series(dtype=float)
+    return estatistica(linhas, nome)
+
+
+def intervalo_confianca(resumo, confidence=0.95):
+    """Intervalo t para a média a partir de um resumo (n, média, desvio padrão)"""
+    from scipy import stats
+
+    n = resumo['n']
+    margem = resumo['desvio_padrao'] / np.sqrt(n) * stats.t.ppf((1 + confidence) / 2., n - 1)
+    return resumo['media'] - margem, resumo['media'] + margem, resumo['media']
+
+
+def teste_t_referencia(resumo, referencia):
+    """Teste t unicaudal (H1: média > referencia) a partir de um resumo.
+
+    Aceita resumos de várias células de uma vez; retorna (t, valor p).
+    """
+    from scipy import stats
+
+    n = resumo['n']
+    estatistica_t = (resumo['media'] - referencia) / (resumo['desvio_padrao'] / np.sqrt(n))
+    return estatistica_t, stats.t.sf(estatistica_t, n - 1)
+
+
+@medido("estatistica")
+def teste_t(resumo_a, resumo_b):
+    """Teste t de duas amostras (variâncias iguais) a partir dos resumos.
+
+    Aceita resumos de várias células de uma vez, comparadas par a par.
+    """
+    from scipy import stats
+
+    a = [np.asarray(resumo_a[c]) for c in ('media', 'desvio_padrao', 'n')]
+    b = [np.asarray(resumo_b[c]) for c in ('media', 'desvio_padrao', 'n')]
+    return stats.ttest_ind_from_stats(*a, *b)
@@ -0,0 +1,157 @@
+"""Intervalos de confiança bootstrap, vetorizados e em paralelo.
+
+As réplicas são geradas em lotes: cada lote é uma matriz de índices
+(réplicas × n) sorteada de uma vez, e a estatística é calculada ao longo
+das linhas, sem laço em Python por réplica. As réplicas são divididas em
+blocos de tamanho fixo, cada um com a sua semente derivada de
+SeedSequence.spawn, e os blocos são distribuídos num pool de processos.
+Como as sementes pertencem aos blocos e não aos processos, o resultado é o
+mesmo qualquer que seja o número de processos.
+
+Abrir um pool com spawn custa mais de um segundo, por isso quem calcula
+várias estatísticas abre um só (pool_bootstrap) e o passa a todas as
+chamadas; com uma CPU ou pouco trabalho, tudo roda no próprio processo.
+
+Estatísticas disponíveis: 'media', 'diferenca_medias', 'inclinacao' e
+'ano_limite' (ano em que a reta atinge o limite, para tendências de queda).
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+
+REPLICAS = 10_000
+SEMENTE = 2025
+CONFIANCA = 0.95
+
+# Réplicas por bloco (cada bloco tem a sua semente)
+REPLICAS_POR_BLOCO = 1_000
+
+# Elementos da matriz de índices de um lote (limita a memória por lote)
+ELEMENTOS_POR_LOTE = 4_000_000
+
+# Processos do pool (0 = um por CPU; 1 = no próprio processo, sem pool)
+TRABALHADORES_BOOTSTRAP = int(os.environ.get("BOOTSTRAP_TRABALHADORES", "0"))
+
+# Abaixo deste trabalho (réplicas × amostras, ~2 s em uma CPU) o pool não compensa
+ELEMENTOS_MINIMOS_POOL = 200_000_000
+
+
+def _media(x):
+    return x.mean(axis=-1)
+
+
+def _inclinacao_intercepto(x, y):
+    xm = x.mean(axis=-1, keepdims=True)
+    ym = y.mean(axis=-1, keepdims=True)
+    dx = x - xm
+    with np.errstate(invalid='ignore', divide='ignore'):
+        inclinacao = (dx * (y - ym)).sum(axis=-1) / (dx * dx).sum(axis=-1)
+    return inclinacao, ym[..., 0] - inclinacao * xm[..., 0]
+
+
+def _inclinacao(x, y):
+    return _inclinacao_intercepto(x, y)[0]
+
+
+def _ano_limite(x, y, limite):
+    inclinacao, intercepto = _inclinacao_intercepto(x, y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ano = (limite - intercepto) / inclinacao
+    return np.where(inclinacao < 0, ano, np.nan)
+
+
+# estatística -> (função, como reamostrar: 'um' grupo, 'dois' grupos independentes ou 'pares')
+ESTATISTICAS = {
+    'media': (_media, 'um'),
+    'diferenca_medias': (lambda a, b: _media(a) - _media(b), 'dois'),
+    'inclinacao': (_inclinacao, 'pares'),
+    'ano_limite': (_ano_limite, 'pares'),
+}
+
+
+def _estatistica(nome, dados, parametros):
+    funcao, _ = ESTATISTICAS[nome]
+    return funcao(*dados, *parametros)
+
+
+def _bloco(nome, dados, parametros, semente, replicas):
+    """Réplicas de um bloco, geradas em lotes vetorizados"""
+    _, modo = ESTATISTICAS[nome]
+    rng = np.random.default_rng(semente)
+    n = max(len(d) for d in dados)
+    por_lote = max(1, ELEMENTOS_POR_LOTE // max(n, 1))
+    saida = np.empty(replicas)
+    for inicio in range(0, replicas, por_lote):
+        k = min(por_lote, replicas - inicio)
+        if modo == 'pares':
+            # Reamostra as linhas: todas as variáveis usam os mesmos índices
+            indices = rng.integers(0, len(dados[0]), size=(k, len(dados[0])), dtype=np.int32)
+            amostra = [d[indices] for d in dados]
+        else:
+            # Cada grupo é reamostrado de forma independente
+            amostra = [d[rng.integers(0, len(d), size=(k, len(d)), dtype=np.int32)] for d in dados]
+        saida[inicio:inicio + k] = _estatistica(nome, amostra, parametros)
+    return saida
+
+
+@contextmanager
+def pool_bootstrap(replicas, amostras, trabalhadores=TRABALHADORES_BOOTSTRAP):
+    """Pool de processos para os blocos, ou None se não compensar.
+
+    replicas × amostras estima o trabalho total das chamadas que vão usar o
+    pool; abaixo de ELEMENTOS_MINIMOS_POOL, ou com um só processo, os blocos
+    rodam no próprio processo.
+    """
+    blocos = -(-replicas // REPLICAS_POR_BLOCO)
+    trabalhadores = min(trabalhadores or os.cpu_count() or 1, blocos)
+    if trabalhadores <= 1 or replicas * amostras < ELEMENTOS_MINIMOS_POOL:
+        yield None
+        return
+    # spawn: o processo do Streamlit tem várias threads, e fork as copiaria pela metade
+    with ProcessPoolExecutor(trabalhadores, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield pool
+
+
+def replicas_bootstrap(nome, *dados, parametros=(), replicas=REPLICAS, semente=SEMENTE,
+                       trabalhadores=TRABALHADORES_BOOTSTRAP, pool=None):
+    """Valores da estatística em cada reamostragem.
+
+    dados são vetores numéricos sem valores ausentes: um para 'media', os
+    dois grupos para 'diferenca_medias' e (x, y) para 'inclinacao' e
+    'ano_limite' (parametros=(limite,)). Sem pool, abre um próprio com
+    pool_bootstrap.
+    """
+    dados = tuple(np.asarray(d, dtype=float) for d in dados)
+    tamanhos = [REPLICAS_POR_BLOCO] * (replicas // REPLICAS_POR_BLOCO)
+    if replicas % REPLICAS_POR_BLOCO:
+        tamanhos.append(replicas % REPLICAS_POR_BLOCO)
+    sementes = np.random.SeedSequence(semente).spawn(len(tamanhos))
+    tarefas = [(nome, dados, parametros, s, k) for s, k in zip(sementes, tamanhos)]
+
+    if pool is not None:
+        return np.concatenate(list(pool.map(_bloco, *zip(*tarefas))))
+    with pool_bootstrap(replicas, sum(len(d) for d in dados), trabalhadores) as pool:
+        if pool is None:
+            return np.concatenate([_bloco(*t) for t in tarefas])
+        return np.concatenate(list(pool.map(_bloco, *zip(*tarefas))))
+
+
+def intervalo_bootstrap(nome, *dados, parametros=(), confianca=CONFIANCA, **opcoes):
+    """Intervalo percentil bootstrap da estatística.
+
+    Retorna (inferior, superior, estimativa), na mesma ordem de
+    analise.agregados.intervalo_confianca. Réplicas indefinidas (ex.: sem
+    cruzamento do limite) ficam fora dos percentis.
+    """
+    dados = tuple(np.asarray(d, dtype=float) for d in dados)
+    estimativa = float(_estatistica(nome, dados, parametros))
+    valores = replicas_bootstrap(nome, *dados, parametros=parametros, **opcoes)
+    valores = valores[np.isfinite(valores)]
+    if not len(valores):
+        return np.nan, np.nan, estimativa
+    alfa = 1 - confianca
+    inferior, superior = np.quantile(valores, [alfa / 2, 1 - alfa / 2])
+    return float(inferior), float(superior), estimativa
@@ -0,0 +1,75 @@
+"""Comparação das estações de interesse com as demais, por bootstrap.
+
+Os intervalos t da página de estudo supõem normalidade, que o teste de
+normalidade costuma rejeitar para sólidos totais. Aqui as mesmas
+comparações são refeitas por bootstrap (analise.bootstrap) e o resultado
+fica em cache por versão dos dados, compartilhado entre sessões.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analise.bootstrap import CONFIANCA, REPLICAS, SEMENTE, intervalo_bootstrap, pool_bootstrap, replicas_bootstrap
+from analise.dados import amostras
+from analise.instrumentacao import medido
+
+# Estações próximas da barragem rompida
+ESTACOES_INTERESSE = ('RD074', 'RD075', 'RD009')
+
+
+def _percentis(valores, estimativa, confianca=CONFIANCA):
+    valores = valores[np.isfinite(valores)]
+    alfa = 1 - confianca
+    inferior, superior = np.quantile(valores, [alfa / 2, 1 - alfa / 2])
+    return float(inferior), float(superior), float(estimativa)
+
+
+@medido("estatistica")
+@st.cache_resource(max_entries=4, show_spinner="Calculando os intervalos bootstrap...")
+def bootstrap_estacoes(versao, estacoes=ESTACOES_INTERESSE, replicas=REPLICAS, limite=5.0):
+    """Intervalos bootstrap das comparações entre estações.
+
+    Retorna um dicionário com (inferior, superior, estimativa) da média de
+    sólidos totais nas estações dadas ('media_interesse'), nas demais
+    ('media_outros') e da diferença entre elas ('diferenca'), além de um
+    quadro com a inclinação da turbidez e o ano em que ela atinge o limite
+    em cada estação dada ('tendencias'). versao só entra na chave do cache.
+    """
+    df = amostras()
+    interesse = df['estação'].isin(estacoes)
+    solidos = df['sólidos totais']
+    a = solidos[interesse].dropna().to_numpy(dtype=float)
+    b = solidos[~interesse].dropna().to_numpy(dtype=float)
+
+    series = {}
+    for estacao in estacoes:
+        serie = df.loc[df['estação'] == estacao, ['ano_decimal', 'turbidez']].dropna()
+        if len(serie) >= 3:
+            series[estacao] = serie
+
+    # Um só pool para todas as estatísticas (sem ele, cada chamada roda no próprio processo)
+    tamanho = len(a) + len(b) + 2 * sum(2 * len(s) for s in series.values())
+    linhas = []
+    with pool_bootstrap(replicas, tamanho) as pool:
+        # Grupos reamostrados de forma independente; a diferença reaproveita as mesmas réplicas
+        replicas_a = replicas_bootstrap('media', a, replicas=replicas, semente=SEMENTE, pool=pool)
+        replicas_b = replicas_bootstrap('media', b, replicas=replicas, semente=SEMENTE + 1, pool=pool)
+
+        for estacao, serie in series.items():
+            x, y = serie['ano_decimal'].to_numpy(dtype=float), serie['turbidez'].to_numpy(dtype=float)
+            inc_inf, inc_sup, inc = intervalo_bootstrap('inclinacao', x, y, replicas=replicas, pool=pool)
+            ano_inf, ano_sup, ano = intervalo_bootstrap('ano_limite', x, y, parametros=(limite,),
+                                                        replicas=replicas, pool=pool)
+            linhas.append({
+                'estação': estacao, 'n': len(serie),
+                'inclinacao': inc, 'inclinacao_inferior': inc_inf, 'inclinacao_superior': inc_sup,
+                'ano_limite': ano, 'ano_limite_inferior': ano_inf, 'ano_limite_superior': ano_sup,
+            })
+
+    return {
+        'media_interesse': _percentis(replicas_a, a.mean()),
+        'media_outros': _percentis(replicas_b, b.mean()),
+        'diferenca': _percentis(replicas_a - replicas_b, a.mean() - b.mean()),
+        'tendencias': pd.DataFrame(linhas),
+        'replicas': replicas,
+    }
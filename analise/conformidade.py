@@ -0,0 +1,171 @@
+"""Conformidade ao limite de turbidez por ano e estação, para qualquer limite.
+
+As medidas de turbidez são ordenadas uma única vez, junto com o código do
+grupo (ano, estação) de cada uma. Para um conjunto de limites, a posição de
+cada limite no vetor ordenado dá a faixa entre limites de cada medida; um
+único np.bincount por (grupo, faixa) e a soma acumulada ao longo das faixas
+dão as amostras conformes (turbidez <= limite) de todos os grupos em todos
+os limites. As contagens já saem agregadas no agrupamento pedido (ano,
+estação, ...), sem passar pela matriz de todos os grupos (ano, estação).
+
+Sobre as contagens: proporção, intervalo exato de Clopper-Pearson e valor p
+do teste binomial bilateral (o mesmo do scipy.stats.binomtest), vetorizados.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analise.dados import COLUNA_DATA, amostras, versao_dados
+from analise.instrumentacao import medido
+
+# H0 do teste binomial: proporção de amostras conformes
+PROPORCAO_ESPERADA = 0.95
+CONFIANCA = 0.95
+
+# Tolerância relativa do scipy.stats.binomtest ao comparar probabilidades
+_TOLERANCIA_PMF = 1 + 1e-7
+
+
+class TurbidezOrdenada:
+    """Medidas de turbidez ordenadas, com o grupo (ano, estação) de cada uma.
+
+    Amostras sem turbidez medida entram no total do grupo e nunca são
+    conformes (como na comparação turbidez <= limite do pandas). Amostras
+    sem estação ou sem data não pertencem a nenhum grupo e ficam de fora.
+    """
+
+    def __init__(self, df, coluna='turbidez'):
+        chaves = [df[COLUNA_DATA].dt.year.rename('ano'), df['estação']]
+        agrupado = df.groupby(chaves, observed=True, sort=True)
+        # Amostras sem estação ou sem data não têm grupo (NaN no ngroup): código -1
+        codigos = agrupado.ngroup().to_numpy(dtype=float, na_value=np.nan)
+        codigos = np.where(np.isnan(codigos), -1, codigos).astype(np.int64)
+        self.grupos = agrupado.size().rename('total').reset_index()
+        self.totais = self.grupos['total'].to_numpy()
+
+        # Mantém a precisão da coluna (float32): 5.3 medido é conforme ao limite 5.3
+        valores = df[coluna].to_numpy()
+        if valores.dtype.kind != 'f':
+            valores = valores.astype(float)
+        medida = (codigos >= 0) & ~np.isnan(valores)
+        ordem = np.argsort(valores[medida], kind='stable')
+        self.valores = valores[medida][ordem]
+        self.codigos = codigos[medida][ordem]
+
+    def _contagens(self, codigos, n, limites):
+        """Medidas <= cada limite por código (codigos alinhado a self.valores): matriz (n × limites)"""
+        limites = np.atleast_1d(np.asarray(limites, dtype=self.valores.dtype))
+        ordem = np.argsort(limites, kind='stable')
+        faixas = len(limites) + 1
+        # Faixa f: medidas acima do (f-1)-ésimo menor limite e até o f-ésimo
+        cortes = np.searchsorted(self.valores, limites[ordem], side='right')
+        faixa = np.repeat(np.arange(faixas), np.diff(cortes, prepend=0, append=len(self.valores)))
+        histograma = np.bincount(codigos.astype(np.int64) * faixas + faixa, minlength=n * faixas)
+        acumulado = histograma.reshape(n, faixas).cumsum(axis=1)[:, :-1]
+        contagens = np.empty_like(acumulado)
+        contagens[:, ordem] = acumulado
+        return contagens
+
+    def conformes(self, limites):
+        """Amostras com turbidez <= limite, por grupo (ano, estação): matriz (grupos × limites)"""
+        return self._contagens(self.codigos, len(self.grupos), limites)
+
+    def conformidade(self, limites, por=('ano',)):
+        """Contagens conformes e totais agregados pelas colunas de `por`.
+
+        por pode ser ('ano',), ('estação',), ('ano', 'estação') ou () para
+        todas as amostras juntas. Retorna um quadro longo com as colunas de
+        `por`, 'limite', 'conformes' e 'total'.
+        """
+        limites = np.atleast_1d(np.asarray(limites, dtype=float))
+        por = list(por)
+        if por:
+            agrupado = self.grupos.groupby(por, observed=True, sort=True)
+            chaves = agrupado.ngroup().to_numpy()
+            rotulos = agrupado.size().reset_index()[por]
+            n = np.bincount(chaves, weights=self.totais, minlength=len(rotulos)).astype(np.int64)
+        else:
+            chaves = np.zeros(len(self.grupos), dtype=np.int64)
+            rotulos = pd.DataFrame(index=[0])
+            n = np.array([self.totais.sum()])
+        # Cada medida contada direto no seu grupo de `por`
+        k = self._contagens(chaves[self.codigos], len(rotulos), limites)
+
+        quadro = rotulos.loc[rotulos.index.repeat(len(limites))].reset_index(drop=True)
+        return quadro.assign(limite=np.tile(limites, len(rotulos)), conformes=k.ravel(),
+                             total=np.repeat(n, len(limites)))
+
+
+def intervalo_clopper_pearson(k, n, confianca=CONFIANCA):
+    """Intervalo exato (Clopper-Pearson) da proporção k / n, vetorizado"""
+    from scipy.stats import beta
+
+    k, n = np.asarray(k, dtype=float), np.asarray(n, dtype=float)
+    alfa = 1 - confianca
+    with np.errstate(invalid='ignore', divide='ignore'):
+        inferior = np.where(k > 0, beta.ppf(alfa / 2, k, n - k + 1), 0.0)
+        superior = np.where(k < n, beta.isf(alfa / 2, k + 1, n - k), 1.0)
+    invalido = n <= 0
+    return np.where(invalido, np.nan, inferior), np.where(invalido, np.nan, superior)
+
+
+def _primeiro(condicao, lo, hi):
+    """Menor j em [lo, hi] com condicao(j) (falsa e depois verdadeira); hi + 1 se nenhum"""
+    hi = hi + 1
+    while np.any(ativo := lo < hi):
+        meio = (lo + hi) // 2
+        verdadeira = condicao(meio)
+        hi = np.where(ativo & verdadeira, meio, hi)
+        lo = np.where(ativo & ~verdadeira, meio + 1, lo)
+    return lo
+
+
+def valor_p_binomial(k, n, p=PROPORCAO_ESPERADA):
+    """Valor p bilateral do teste binomial exato, vetorizado.
+
+    Reproduz scipy.stats.binomtest(k, n, p).pvalue: a cauda oposta reúne os
+    valores com probabilidade não maior que a de k, achados por busca binária
+    do lado da moda oposto a k.
+    """
+    from scipy.stats import binom
+
+    k, n = np.broadcast_arrays(np.asarray(k, dtype=np.int64), np.asarray(n, dtype=np.int64))
+    d = binom.pmf(k, n, p) * _TOLERANCIA_PMF
+    esperado = p * n
+
+    # k abaixo do esperado: cauda de cima, a partir do primeiro j com pmf(j) <= d
+    inicio = _primeiro(lambda j: binom.pmf(j, n, p) <= d, np.ceil(esperado).astype(np.int64), n)
+    abaixo = binom.cdf(k, n, p) + binom.sf(inicio - 1, n, p)
+    # k acima do esperado: cauda de baixo, até o último j com pmf(j) <= d
+    fim = _primeiro(lambda j: binom.pmf(j, n, p) > d, np.zeros_like(n), np.floor(esperado).astype(np.int64))
+    acima = binom.cdf(fim - 1, n, p) + binom.sf(k - 1, n, p)
+
+    valor = np.where(k == esperado, 1.0, np.where(k < esperado, abaixo, acima))
+    return np.where(n > 0, np.minimum(valor, 1.0), np.nan)
+
+
+def avaliar(quadro, p=PROPORCAO_ESPERADA, confianca=CONFIANCA):
+    """Acrescenta proporção, intervalo exato e valor p a um quadro de TurbidezOrdenada.conformidade"""
+    k, n = quadro['conformes'].to_numpy(), quadro['total'].to_numpy()
+    inferior, superior = intervalo_clopper_pearson(k, n, confianca)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        proporcao = k / n
+    return quadro.assign(proporcao=proporcao, ic_inferior=inferior, ic_superior=superior,
+                         p_valor=valor_p_binomial(k, n, p))
+
+
+@st.cache_resource(max_entries=4, show_spinner="Ordenando a turbidez por ano e estação...")
+def _turbidez_ordenada(versao):
+    """versao (de analise.dados.versao_dados) só entra na chave do cache"""
+    return TurbidezOrdenada(amostras())
+
+
+def turbidez_ordenada():
+    """TurbidezOrdenada de todas as amostras, em cache por versão dos dados"""
+    return _turbidez_ordenada(versao_dados())
+
+
+@medido("estatistica")
+def conformidade(limites, por=('ano',), p=PROPORCAO_ESPERADA, confianca=CONFIANCA):
+    """Proporção conforme, intervalo exato e valor p para cada limite e grupo de `por`"""
+    return avaliar(turbidez_ordenada().conformidade(limites, por), p, confianca)
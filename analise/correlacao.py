@@ -0,0 +1,156 @@
+"""Matrizes de correlação em cache, por período e método.
+
+Pearson é calculado a partir de estatísticas suficientes por par de
+colunas, usando só as linhas em que as duas estão presentes (pairwise
+complete, como o DataFrame.corr): contagem, somas, somas dos quadrados e
+soma dos produtos. Essas estatísticas são somáveis, então a matriz de todos
+os períodos é a soma das de cada partição; acrescentar um período calcula
+apenas as dele. Spearman depende dos postos de cada par e é recalculado
+pelo pandas, uma vez por (período, método).
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analise.dados import COLUNAS_BASE, amostras, dados_periodo, periodos, versao_dados
+from analise.instrumentacao import medido
+
+METODOS = ('pearson', 'spearman')
+
+# Chave usada para a matriz com todos os períodos (só as colunas comuns)
+TODOS = 'todos'
+
+# Nível de significância da visão filtrada
+ALFA = 0.05
+
+
+def estatisticas_pares(df):
+    """Estatísticas suficientes de Pearson por par de colunas numéricas.
+
+    Para cada par (i, j), n[i, j] conta as linhas com as duas colunas
+    presentes; soma[i, j] e soma_quadrados[i, j] somam a coluna i nessas
+    linhas; produtos[i, j] soma x_i * x_j.
+    """
+    valores = df.to_numpy(dtype=float)
+    presente = ~np.isnan(valores)
+    x = np.where(presente, valores, 0.0)
+    m = presente.astype(float)
+    return {
+        'colunas': list(df.columns),
+        'n': m.T @ m,
+        'soma': x.T @ m,
+        'soma_quadrados': (x * x).T @ m,
+        'produtos': x.T @ x,
+    }
+
+
+def _selecionar(estatisticas, colunas):
+    posicoes = [estatisticas['colunas'].index(c) for c in colunas]
+    indice = np.ix_(posicoes, posicoes)
+    return {'colunas': list(colunas),
+            **{k: v[indice] for k, v in estatisticas.items() if k != 'colunas'}}
+
+
+def combinar_estatisticas(*partes, colunas):
+    """Soma as estatísticas de várias partições, restritas às colunas dadas"""
+    partes = [_selecionar(p, colunas) for p in partes]
+    return {'colunas': list(colunas),
+            **{k: sum(p[k] for p in partes) for k in ('n', 'soma', 'soma_quadrados', 'produtos')}}
+
+
+def pearson(estatisticas):
+    """Matriz de Pearson (pairwise complete) a partir das estatísticas"""
+    n, s, q, p = (estatisticas[k] for k in ('n', 'soma', 'soma_quadrados', 'produtos'))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariancia = n * p - s * s.T
+        variancia = n * q - s * s
+        # Coluna constante no par: a subtração deixa só resíduo de arredondamento
+        variancia[variancia <= 1e-10 * n * q] = np.nan
+        r = covariancia / np.sqrt(variancia * variancia.T)
+    r[n < 2] = np.nan
+    r = np.clip(r, -1, 1)
+    colunas = estatisticas['colunas']
+    return pd.DataFrame(r, index=colunas, columns=colunas)
+
+
+def contagens(estatisticas):
+    """Número de linhas com as duas colunas presentes, por par"""
+    colunas = estatisticas['colunas']
+    return pd.DataFrame(estatisticas['n'].astype(int), index=colunas, columns=colunas)
+
+
+def valores_p(r, n):
+    """Valor p bilateral de H0: correlação nula (aproximação t com n - 2 g.l.)"""
+    from scipy.stats import t
+
+    r, n = np.asarray(r, dtype=float), np.asarray(n, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        estatistica = r * np.sqrt((n - 2) / (1 - r * r))
+    return 2 * t.sf(np.abs(estatistica), n - 2)
+
+
+def _numericas(df):
+    return df.select_dtypes(include='number')
+
+
+@st.cache_resource(max_entries=32)
+def _estatisticas_periodo(periodo):
+    return estatisticas_pares(_numericas(dados_periodo(periodo)))
+
+
+@st.cache_resource(max_entries=32, show_spinner="Calculando correlações...")
+def _correlacao(periodo, metodo, versao):
+    if metodo == 'pearson':
+        if periodo == TODOS:
+            # Soma das estatísticas de cada partição (as já calculadas vêm do cache)
+            colunas = [c for c in COLUNAS_BASE if c in _numericas(amostras()).columns and c != 'ano_decimal']
+            estatisticas = combinar_estatisticas(*(_estatisticas_periodo(p) for p in periodos()), colunas=colunas)
+        else:
+            estatisticas = _estatisticas_periodo(periodo)
+        return pearson(estatisticas), contagens(estatisticas)
+
+    df = _numericas(amostras() if periodo == TODOS else dados_periodo(periodo))
+    if periodo == TODOS:
+        df = df.drop(columns='ano_decimal')
+    presente = df.notna().to_numpy().astype(float)
+    n = pd.DataFrame(presente.T @ presente, index=df.columns, columns=df.columns).astype(int)
+    return df.corr(method=metodo), n
+
+
+@medido("estatistica")
+def correlacao(periodo, metodo='pearson'):
+    """Matriz de correlação e contagens por par de um período (ou TODOS).
+
+    O resultado fica em cache, compartilhado entre sessões; não deve ser
+    modificado.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método desconhecido: {metodo}")
+    # Só a matriz de todos os períodos muda quando um período é acrescentado
+    return _correlacao(periodo, metodo, versao_dados() if periodo == TODOS else None)
+
+
+def filtrar_significativas(r, n, alfa=ALFA, minimo=0.0):
+    """Matriz só com as células significativas e |r| >= minimo (as demais NaN).
+
+    Linhas/colunas sem nenhuma célula restante fora da diagonal saem.
+    """
+    mantidas = (valores_p(r, n) < alfa) & (np.abs(r.to_numpy()) >= minimo)
+    np.fill_diagonal(mantidas, False)
+    filtrada = r.where(mantidas)
+    usadas = mantidas.any(axis=0)
+    return filtrada.loc[usadas, usadas]
+
+
+def ordem_agrupada(r):
+    """Ordem das colunas por agrupamento hierárquico (distância 1 - |r|)"""
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    validas = r.columns[r.notna().sum() > 1]
+    if len(validas) < 3:
+        return list(validas)
+    distancia = 1 - r.loc[validas, validas].abs().fillna(0).to_numpy()
+    np.fill_diagonal(distancia, 0)
+    distancia = (distancia + distancia.T) / 2
+    return list(validas[leaves_list(linkage(squareform(distancia, checks=False), method='average'))])
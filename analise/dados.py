@@ -0,0 +1,413 @@
+"""Camada única de acesso aos dados de monitoramento da qualidade da água.
+
+As planilhas são lidas, normalizadas e mantidas em memória uma única vez
+por processo. O quadro base ("longo") guarda as colunas comuns a todos os
+períodos, com as linhas de cada período em um bloco contíguo; as colunas
+exclusivas de cada período ficam em quadros à parte. As visões por período
+são fatias desse mesmo quadro base, sem cópia dos dados. Os tipos
+compactos de analise.esquema são aplicados a cada partição ao carregá-la.
+
+Os períodos formam um armazém só de acréscimo: cada planilha vira uma
+partição em Parquet (já normalizada, ordenada e com as colunas derivadas),
+registrada em um manifesto. Planilhas novas colocadas em dados/ são
+detectadas e acrescentadas como novas partições, sem reler o histórico.
+As planilhas que precisam ser lidas do xlsx são processadas em paralelo,
+num pool de processos, e acrescentadas na ordem dos períodos.
+"""
+import glob
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analise.agregados import ESTATISTICAS, QUANTIS, agregar, combinar, quantis_pendentes
+from analise.esquema import aplicar_esquema, unificar_categorias
+from analise.ingestao import DIRETORIO_CACHE, VERSAO_FORMATO, hash_arquivo, ler_planilha
+from analise.instrumentacao import medido
+
+# Chave do período -> planilha de origem, na ordem cronológica
+ARQUIVOS = {
+    "2019": "dados/seriehistorica2019.xlsx",
+    "1S2020": "dados/primeirosemestre2020.xlsx",
+    "2S2020": "dados/segundosemestre2020.xlsx",
+    "2021": "dados/ano2021.xlsx"
+}
+
+# Rótulos exibidos nos seletores de período
+ROTULOS_PERIODO = {
+    "2019": "2019",
+    "1S2020": "2020 - 1º Semestre",
+    "2S2020": "2020 - 2º Semestre",
+    "2021": "2021"
+}
+
+COLUNA_DATA = 'data de amostragem'
+
+_log = logging.getLogger(__name__)
+
+# Colunas do quadro longo (presentes em todas as exportações)
+COLUNAS_BASE = [
+    'estação', COLUNA_DATA, 'ano_decimal', 'cloreto total', 'oxigênio dissolvido',
+    'escherichia coli', 'ph in loco', 'demanda bioquímica de oxigênio', 'nitrato',
+    'fósforo total', 'temperatura da água', 'turbidez', 'sólidos totais'
+]
+
+DIRETORIO_PARTICOES = os.path.join(DIRETORIO_CACHE, "particoes")
+
+# Incrementar quando o conteúdo das partições (colunas derivadas,
+# agregados) mudar, invalidando as partições já gravadas.
+VERSAO_ARMAZEM = 2
+
+# Processos usados para ler as planilhas no carregamento a frio
+# (0 = um por CPU; 1 = leitura sequencial, sem pool)
+TRABALHADORES_INGESTAO = int(os.environ.get("INGESTAO_TRABALHADORES", "0"))
+
+
+def normalizar_colunas(df):
+    """Padroniza os nomes das colunas (minúsculas, sem espaços nas pontas)"""
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    return df.rename(columns={'solidos totais': 'sólidos totais'})
+
+
+def rotulo_periodo(chave):
+    """Rótulo legível de um período"""
+    return ROTULOS_PERIODO.get(chave, chave)
+
+
+def _chave_periodo(datas):
+    """Deduz a chave de um período novo a partir das datas de amostragem"""
+    inicio, fim = datas.min(), datas.max()
+    if inicio.year != fim.year:
+        return f"{inicio.year}-{fim.year}"
+    if fim.month <= 6:
+        return f"1S{inicio.year}"
+    if inicio.month >= 7:
+        return f"2S{inicio.year}"
+    return str(inicio.year)
+
+
+def _ler_periodo(caminho):
+    """Lê e normaliza uma planilha, já com as colunas derivadas.
+
+    Retorna None (com um aviso no log) se a planilha não tem a coluna de
+    data de amostragem ou nenhuma amostra com data válida.
+    """
+    # Linhas sem data válida (rodapés/observações do relatório) são descartadas na leitura
+    df = normalizar_colunas(ler_planilha(caminho, coluna_data=COLUNA_DATA))
+    if COLUNA_DATA not in df.columns:
+        _log.warning("Planilha ignorada, sem a coluna '%s': %s", COLUNA_DATA, caminho)
+        return None
+    if df.empty:
+        _log.warning("Planilha ignorada, sem amostras com data válida: %s", caminho)
+        return None
+    df = df.sort_values(COLUNA_DATA, kind='stable', ignore_index=True)
+    ano_decimal = df[COLUNA_DATA].dt.year + (df[COLUNA_DATA].dt.dayofyear / 365)
+    return pd.concat([df, ano_decimal.rename('ano_decimal')], axis=1)
+
+
+def _colunas_numericas(df):
+    return [c for c in df.columns if c != 'ano_decimal' and pd.api.types.is_numeric_dtype(df[c])]
+
+
+def _processar_planilha(caminho):
+    """Lê uma planilha e calcula os agregados da partição (roda nos processos do pool).
+
+    Retorna None se a planilha não tem amostras de monitoramento.
+    """
+    df = _ler_periodo(caminho)
+    if df is None:
+        return None
+    return df, agregar(df, 'estação', _colunas_numericas(df), QUANTIS)
+
+
+def _planilhas_monitoramento():
+    """Planilhas de monitoramento em dados/ (as de IQA e os arquivos de trava do Excel ficam de fora)"""
+    conhecidas = list(ARQUIVOS.values())
+    novas = sorted(c for c in glob.glob(os.path.join("dados", "*.xls*"))
+                   if c not in conhecidas and not os.path.basename(c).upper().startswith(("IQA", "~$")))
+    return [c for c in conhecidas if os.path.exists(c)] + novas
+
+
+class ArmazemParticoes:
+    """Armazém só de acréscimo dos períodos de monitoramento.
+
+    Mantém em memória o quadro longo, as colunas exclusivas de cada
+    partição, o cubo de agregados por (período, estação, coluna) e os
+    agregados por estação de todos os períodos. Uma partição nova é apenas
+    acrescentada: suas colunas derivadas e seus agregados são calculados
+    só sobre ela e combinados com os existentes.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_PARTICOES, trabalhadores=TRABALHADORES_INGESTAO):
+        self.diretorio = diretorio
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.particoes = []
+        self.versao = ""
+        self.base = None
+        self.extras = {}
+        self.limites = {}
+        self.agregados_estacao = None
+        self.cubo = {}
+        self.memoria = {}
+        self._carregadas = set()
+        # Planilhas sem amostras -> (tamanho, data de modificação) quando foram ignoradas
+        self._ignoradas = {}
+        self._trava = threading.Lock()
+        self._manifesto = self._ler_manifesto()
+
+    # --- manifesto -------------------------------------------------------
+    @property
+    def _caminho_manifesto(self):
+        return os.path.join(self.diretorio, "manifesto.json")
+
+    def _ler_manifesto(self):
+        try:
+            with open(self._caminho_manifesto, encoding="utf-8") as f:
+                manifesto = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifesto.get("versao") != [VERSAO_FORMATO, VERSAO_ARMAZEM]:
+            return {}
+        return {p["arquivo"]: p for p in manifesto["particoes"]}
+
+    def _gravar_manifesto(self):
+        manifesto = {"versao": [VERSAO_FORMATO, VERSAO_ARMAZEM], "particoes": list(self._manifesto.values())}
+        temporario = self._caminho_manifesto + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, self._caminho_manifesto)
+
+    def _caminhos_particao(self, chave):
+        return (os.path.join(self.diretorio, f"{chave}.parquet"),
+                os.path.join(self.diretorio, f"{chave}-agregados.parquet"))
+
+    # --- ingestão --------------------------------------------------------
+    def _particao_valida(self, caminho):
+        """Entrada do manifesto cuja partição em disco ainda vale (ou None).
+
+        Se só a data de modificação mudou, a nova data vai para o manifesto,
+        para que as próximas cargas não calculem o hash de novo.
+        """
+        estado = os.stat(caminho)
+        entrada = self._manifesto.get(caminho)
+        if entrada and (entrada["tamanho"], entrada["modificado"]) != (estado.st_size, estado.st_mtime):
+            # Data de modificação mudou: só reprocessa se o conteúdo mudou
+            if entrada["hash"] == hash_arquivo(caminho):
+                entrada.update(tamanho=estado.st_size, modificado=estado.st_mtime)
+                try:
+                    self._gravar_manifesto()
+                except OSError:
+                    pass
+            else:
+                entrada = None
+        if entrada and all(os.path.exists(a) for a in self._caminhos_particao(entrada["chave"])):
+            return entrada
+        return None
+
+    @staticmethod
+    def _estado(caminho):
+        estado = os.stat(caminho)
+        return estado.st_size, estado.st_mtime
+
+    def _ler_em_paralelo(self, caminhos):
+        """Lê as planilhas dadas, em paralelo se houver mais de uma.
+
+        Retorna {caminho: (df, agregados)}.
+        """
+        trabalhadores = min(self.trabalhadores, len(caminhos))
+        if trabalhadores <= 1:
+            return {c: _processar_planilha(c) for c in caminhos}
+        # spawn: o processo do Streamlit tem várias threads, e fork as copiaria pela metade
+        with ProcessPoolExecutor(trabalhadores, mp_context=multiprocessing.get_context("spawn")) as pool:
+            return dict(zip(caminhos, pool.map(_processar_planilha, caminhos)))
+
+    def _materializar(self, caminho, entrada, lidas):
+        """Lê a partição de uma planilha do disco ou a gera a partir do xlsx.
+
+        entrada é a de _particao_valida (None se a partição não vale mais) e
+        lidas guarda o resultado de _processar_planilha das planilhas já
+        processadas pelo pool. Retorna None se a planilha não tem amostras
+        de monitoramento.
+        """
+        if entrada:
+            arquivo, arquivo_agregados = self._caminhos_particao(entrada["chave"])
+            return entrada["chave"], pd.read_parquet(arquivo), pd.read_parquet(arquivo_agregados)
+
+        lida = lidas[caminho] if caminho in lidas else _processar_planilha(caminho)
+        if lida is None:
+            return None
+        df, agregados = lida
+        estado = os.stat(caminho)
+        chave = next((k for k, v in ARQUIVOS.items() if v == caminho), None)
+        if chave is None:
+            chave = base = _chave_periodo(df[COLUNA_DATA])
+            usadas = {e["chave"] for a, e in self._manifesto.items() if a != caminho}
+            sufixo = 2
+            while chave in usadas:
+                chave, sufixo = f"{base}-{sufixo}", sufixo + 1
+        self._manifesto[caminho] = {
+            "chave": chave, "arquivo": caminho, "hash": hash_arquivo(caminho),
+            "tamanho": estado.st_size, "modificado": estado.st_mtime,
+            "linhas": len(df), "data_inicial": str(df[COLUNA_DATA].min().date()),
+            "data_final": str(df[COLUNA_DATA].max().date())
+        }
+        try:
+            os.makedirs(self.diretorio, exist_ok=True)
+            arquivo, arquivo_agregados = self._caminhos_particao(chave)
+            df.to_parquet(arquivo, index=False)
+            agregados.to_parquet(arquivo_agregados)
+            self._gravar_manifesto()
+        except OSError:
+            # Sem permissão de escrita: a partição fica só em memória
+            pass
+        return chave, df, agregados
+
+    def _acrescentar(self, chave, df, agregados, hash_):
+        """Acrescenta uma partição ao quadro longo e aos agregados"""
+        parte = aplicar_esquema(df.reindex(columns=COLUNAS_BASE).assign(periodo=chave))
+        inicio = 0 if self.base is None else len(self.base)
+        if self.base is None:
+            self.base = parte
+        else:
+            self.base, parte = unificar_categorias(self.base, parte)
+            self.base = pd.concat([self.base, parte], ignore_index=True)
+        # Cópia explícita para não reter os blocos das colunas comuns
+        extra = aplicar_esquema(df.drop(columns=[c for c in COLUNAS_BASE if c in df.columns])).copy()
+        self.extras[chave] = extra
+        self.limites[chave] = (inicio, inicio + len(df))
+        self.memoria[chave] = {
+            'linhas': len(df),
+            'bytes_antes': int(df.memory_usage(index=False, deep=True).sum()),
+            'bytes_depois': int(parte.memory_usage(index=False, deep=True).sum()
+                                + extra.memory_usage(index=False, deep=True).sum())
+        }
+        self.cubo[chave] = agregados
+        self.agregados_estacao = combinar(self.agregados_estacao, agregados)
+        self.particoes.append(chave)
+        # A versão dos dados encadeia os hashes das planilhas, na ordem de ingestão
+        self.versao = hashlib.sha256(f"{self.versao}:{chave}:{hash_}".encode()).hexdigest()[:16]
+
+    def _coluna(self, coluna):
+        """Valores de uma coluna em todo o quadro longo (NaN nos períodos sem ela)"""
+        if coluna in self.base.columns:
+            return self.base[coluna]
+        valores = np.full(len(self.base), np.nan)
+        for chave, extra in self.extras.items():
+            if coluna in extra.columns:
+                inicio, fim = self.limites[chave]
+                valores[inicio:fim] = extra[coluna].to_numpy(dtype=float, na_value=np.nan)
+        return pd.Series(valores, index=self.base.index, name=coluna)
+
+    def _recalcular_quantis(self):
+        """Quantis das células com amostras de mais de um período, sobre as amostras delas"""
+        pendentes = quantis_pendentes(self.agregados_estacao)
+        if not len(pendentes):
+            return
+        selecao = self.base['estação'].isin(pendentes.get_level_values('estação').unique())
+        colunas = pendentes.get_level_values('coluna').unique()
+        df = pd.DataFrame({c: self._coluna(c)[selecao] for c in colunas})
+        df['estação'] = self.base['estação'][selecao]
+        quantis = agregar(df, 'estação', list(colunas), QUANTIS).drop(columns=list(ESTATISTICAS))
+        agregados = self.agregados_estacao.copy()
+        agregados.loc[pendentes, quantis.columns] = quantis.reindex(pendentes)
+        self.agregados_estacao = agregados
+
+    @medido("dados")
+    def atualizar(self):
+        """Detecta planilhas ainda não carregadas e as acrescenta.
+
+        Retorna a lista de chaves das partições acrescentadas.
+        """
+        with self._trava:
+            pendentes = [c for c in _planilhas_monitoramento()
+                         if c not in self._carregadas and self._ignoradas.get(c) != self._estado(c)]
+            # Cada partição é validada uma única vez (o hash da planilha pode ser calculado)
+            validas = {c: self._particao_valida(c) for c in pendentes}
+            lidas = self._ler_em_paralelo([c for c in pendentes if validas[c] is None])
+            novas = []
+            # Acrescenta na ordem dos períodos, independentemente de qual leitura terminou antes
+            for caminho in pendentes:
+                materializada = self._materializar(caminho, validas[caminho], lidas)
+                if materializada is None:
+                    # Só volta a ser lida se o arquivo mudar
+                    self._ignoradas[caminho] = self._estado(caminho)
+                    continue
+                chave, df, agregados = materializada
+                self._acrescentar(chave, df, agregados, self._manifesto[caminho]["hash"])
+                self._carregadas.add(caminho)
+                novas.append(chave)
+            if novas:
+                self._recalcular_quantis()
+            return novas
+
+
+@st.cache_resource(show_spinner="Carregando dados de monitoramento...")
+def _armazem():
+    armazem = ArmazemParticoes()
+    armazem.atualizar()
+    return armazem
+
+
+def atualizar():
+    """Acrescenta ao armazém as planilhas novas encontradas em dados/"""
+    return _armazem().atualizar()
+
+
+def versao_dados():
+    """Identificador da versão atual dos dados (muda a cada partição acrescentada)"""
+    return _armazem().versao
+
+
+@medido("dados")
+def amostras():
+    """Quadro longo com todos os períodos concatenados (somente leitura)"""
+    return _armazem().base
+
+
+def periodos():
+    """Lista das chaves de período disponíveis, na ordem de ingestão"""
+    return list(_armazem().particoes)
+
+
+@medido("dados")
+def agregados_por_estacao():
+    """Agregados (n, soma, soma dos quadrados, mín., máx.) e quantis por coluna e estação"""
+    return _armazem().agregados_estacao
+
+
+@medido("dados")
+def cubo_agregados(periodo):
+    """Agregados e quantis de um período, indexados por (coluna, estação)"""
+    return _armazem().cubo[periodo]
+
+
+def relatorio_memoria():
+    """Memória de cada partição antes e depois do esquema de tipos compactos"""
+    relatorio = pd.DataFrame.from_dict(_armazem().memoria, orient='index')
+    relatorio.loc['total'] = relatorio.sum()
+    relatorio['reducao'] = 1 - relatorio['bytes_depois'] / relatorio['bytes_antes']
+    return relatorio
+
+
+@medido("dados")
+def dados_periodo(nome):
+    """Visão de um período com todas as suas colunas.
+
+    As colunas comuns são uma fatia do quadro longo; as exclusivas do
+    período são anexadas lado a lado, também sem cópia. Isso depende do
+    copy-on-write do pandas 3 (sem ele, drop e concat copiam a base; daí o
+    pandas>=3.0 do requirements.txt). As colunas
+    derivadas (periodo, ano_decimal) ficam de fora.
+    """
+    armazem = _armazem()
+    inicio, fim = armazem.limites[nome]
+    fatia = armazem.base.iloc[inicio:fim].drop(columns=['periodo', 'ano_decimal'])
+    extra = armazem.extras[nome].set_axis(fatia.index)
+    return pd.concat([fatia, extra], axis=1)
@@ -0,0 +1,91 @@
+"""Esquema de tipos compactos aplicado aos dados no carregamento.
+
+Cada sessão do Streamlit mantém referências aos quadros carregados, então
+a memória de cada quadro limita quantos usuários cabem em um mesmo nó.
+Códigos de estação, períodos e textos repetitivos viram categorias; as
+medições são reduzidas para float32 quando isso não altera os valores
+além da precisão com que foram registradas.
+"""
+import numpy as np
+import pandas as pd
+
+# Colunas sempre categóricas
+CATEGORICAS = ['estação', 'periodo']
+
+# Colunas mantidas em float64 (usadas como variável explicativa nas regressões)
+PRECISAO_DUPLA = ['ano_decimal']
+
+# Algarismos significativos que o float32 sempre preserva (6)
+ALGARISMOS_FLOAT32 = np.finfo(np.float32).precision
+
+# Textos com no máximo essa fração de valores distintos viram categoria
+FRACAO_CATEGORIA = 0.5
+
+
+def _cabe_em_float32(valores):
+    """Se os valores foram registrados com no máximo ALGARISMOS_FLOAT32 algarismos.
+
+    O arredondamento do float32 (~6e-8 relativo) nunca chega ao último
+    algarismo registrado nesse caso; colunas com mais algarismos (valores
+    calculados, coordenadas) ficam em float64.
+    """
+    x = valores.to_numpy(dtype=np.float64, na_value=np.nan)
+    finitos = x[np.isfinite(x) & (x != 0)]
+    if finitos.size == 0:
+        return True
+    if np.abs(finitos).max() > np.finfo(np.float32).max or np.abs(finitos).min() < np.finfo(np.float32).tiny:
+        return False
+    escala = 10.0 ** (ALGARISMOS_FLOAT32 - 1 - np.floor(np.log10(np.abs(finitos))))
+    arredondados = np.round(finitos * escala) / escala
+    return bool(np.all(np.abs(arredondados - finitos) <= 4 * np.finfo(np.float64).eps * np.abs(finitos)))
+
+
+def aplicar_esquema(df):
+    """Converte as colunas de df para os tipos compactos do esquema"""
+    convertidas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if coluna in CATEGORICAS:
+            if not isinstance(serie.dtype, pd.CategoricalDtype):
+                convertidas[coluna] = serie.astype('category')
+        elif coluna in PRECISAO_DUPLA:
+            continue
+        elif pd.api.types.is_float_dtype(serie) and serie.dtype != np.float32:
+            if _cabe_em_float32(serie):
+                convertidas[coluna] = serie.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(serie):
+            convertidas[coluna] = pd.to_numeric(serie, downcast='integer')
+        elif pd.api.types.is_string_dtype(serie) or serie.dtype == object:
+            if len(serie) and serie.nunique() <= FRACAO_CATEGORIA * len(serie):
+                convertidas[coluna] = serie.astype('category')
+    if not convertidas:
+        return df
+    return df.assign(**convertidas)
+
+
+def unificar_categorias(*frames, colunas=CATEGORICAS):
+    """Dá às colunas categóricas de vários quadros as mesmas categorias.
+
+    Assim o pd.concat mantém o tipo categórico em vez de voltar a texto.
+    Novas categorias são acrescentadas ao fim, sem recodificar as linhas
+    já existentes.
+    """
+    frames = list(frames)
+    for coluna in colunas:
+        presentes = [f for f in frames if f is not None and coluna in f.columns]
+        if not presentes:
+            continue
+        categorias = pd.Index([])
+        for f in presentes:
+            serie = f[coluna]
+            novas = serie.cat.categories if isinstance(serie.dtype, pd.CategoricalDtype) else pd.Index(serie.dropna().unique())
+            categorias = categorias.append(novas.difference(categorias))
+        tipo = pd.CategoricalDtype(categorias)
+        for i, f in enumerate(frames):
+            if f is not None and coluna in f.columns and f[coluna].dtype != tipo:
+                serie = f[coluna]
+                if isinstance(serie.dtype, pd.CategoricalDtype):
+                    serie = serie.cat.add_categories(categorias.difference(serie.cat.categories))
+                frames[i] = f.assign(**{coluna: serie.astype(tipo)})
+    return frames
+
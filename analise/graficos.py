@@ -0,0 +1,106 @@
+"""Redução de pontos no servidor antes de enviar séries ao Plotly.
+
+O navegador recebe no máximo alguns pontos por pixel de largura do
+gráfico, escolhidos por LTTB (Largest-Triangle-Three-Buckets) ou por
+mínimo/máximo em cada balde. Valores atípicos são sempre mantidos, para que
+picos isolados continuem visíveis.
+"""
+import numpy as np
+import streamlit as st
+
+from analise.instrumentacao import intervalo
+
+# Largura útil (px) de um gráfico em st.plotly_chart com layout "wide"
+LARGURA_GRAFICO = 1200
+
+# A partir de quantos pontos usar renderização WebGL (Scattergl)
+LIMITE_WEBGL = 1000
+
+# Distância (em IQRs) além dos quartis para um ponto ser considerado atípico
+FATOR_ATIPICO = 3.0
+
+
+def _numerico(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb(x, y, n_saida):
+    """Índices escolhidos pelo LTTB; x deve estar em ordem crescente"""
+    n = len(x)
+    if n_saida >= n or n_saida < 3:
+        return np.arange(n)
+    x, y = _numerico(x), np.asarray(y, dtype=np.float64)
+    bordas = np.linspace(1, n - 1, n_saida - 1).astype(int)
+    escolhidos = np.empty(n_saida, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+    for i in range(n_saida - 2):
+        inicio, fim = bordas[i], bordas[i + 1]
+        # Média do próximo balde (ou o último ponto, no último balde)
+        proximo_fim = bordas[i + 2] if i + 2 < len(bordas) else n
+        mx, my = x[fim:proximo_fim].mean(), y[fim:proximo_fim].mean()
+        ax, ay = x[anterior], y[anterior]
+        area = np.abs((ax - mx) * (y[inicio:fim] - ay) - (ax - x[inicio:fim]) * (my - ay))
+        anterior = inicio + int(np.argmax(area))
+        escolhidos[i + 1] = anterior
+    return escolhidos
+
+
+def minmax_por_balde(y, n_baldes):
+    """Índices do mínimo e do máximo de y em cada balde consecutivo"""
+    n = len(y)
+    if 2 * n_baldes >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    balde = np.arange(n) * n_baldes // n
+    ordem = np.lexsort((y, balde))
+    bordas = np.flatnonzero(np.diff(balde[ordem])) + 1
+    primeiros = np.concatenate([[0], bordas])
+    ultimos = np.concatenate([bordas - 1, [n - 1]])
+    return np.unique(np.concatenate([ordem[primeiros], ordem[ultimos]]))
+
+
+def indices_atipicos(y, fator=FATOR_ATIPICO):
+    """Índices dos pontos além de fator·IQR dos quartis"""
+    y = np.asarray(y, dtype=np.float64)
+    q1, q3 = np.nanpercentile(y, [25, 75])
+    iqr = q3 - q1
+    return np.flatnonzero((y < q1 - fator * iqr) | (y > q3 + fator * iqr))
+
+
+def reduzir_serie(x, y, largura_px=LARGURA_GRAFICO, metodo='lttb'):
+    """Índices (na ordem de x) dos pontos a desenhar de uma série.
+
+    metodo='lttb' preserva o formato de linhas; metodo='minmax' preserva o
+    envelope de nuvens de pontos. Em ambos, os pontos atípicos entram
+    sempre. Se x não estiver ordenado, a série é ordenada antes.
+    """
+    n = len(y)
+    if n <= 2 * largura_px:
+        return np.arange(n)
+    x_num = _numerico(x)
+    ordem = None
+    if np.any(np.diff(x_num) < 0):
+        ordem = np.argsort(x_num, kind='stable')
+        x, y = np.asarray(x)[ordem], np.asarray(y)[ordem]
+
+    if metodo == 'minmax':
+        escolhidos = minmax_por_balde(y, largura_px)
+    else:
+        escolhidos = lttb(x, y, 2 * largura_px)
+    escolhidos = np.union1d(escolhidos, indices_atipicos(y))
+    return escolhidos if ordem is None else ordem[escolhidos]
+
+
+def usar_webgl(n_pontos):
+    """Se a quantidade de pontos justifica renderizar com WebGL"""
+    return n_pontos > LIMITE_WEBGL
+
+
+def mostrar_figura(fig, **opcoes):
+    """st.plotly_chart medido (a serialização da figura entra no intervalo)"""
+    with intervalo("plotly_chart", "grafico"):
+        st.plotly_chart(fig, **opcoes)
@@ -0,0 +1,139 @@
+"""Variantes redimensionadas das imagens de assets/, servidas como estáticos.
+
+Cada imagem ganha versões em WebP (e AVIF, se o Pillow tiver suporte) em
+algumas larguras, gravadas em static/imagens/ com o hash do original no
+nome. As páginas mostram a imagem num <picture> com srcset/sizes: o
+navegador escolhe a menor variante que cobre a largura ocupada pela imagem
+na tela. Como o nome muda quando o original muda, as variantes podem ficar
+em cache no navegador indefinidamente (ver servidor.py).
+
+As variantes são geradas na primeira vez que a imagem é pedida; para gerar
+todas antes do deploy:
+    python -m analise.imagens
+"""
+import html
+import os
+
+import streamlit as st
+
+from analise.ingestao import hash_arquivo
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIRETORIO_ASSETS = os.path.join(RAIZ, "assets")
+
+# Pasta servida pelo Streamlit em app/static/ (server.enableStaticServing)
+DIRETORIO_VARIANTES = os.path.join(RAIZ, "static", "imagens")
+URL_VARIANTES = "app/static/imagens"
+
+LARGURAS = (480, 960, 1600)
+
+# Qualidade de compressão por formato, do preferido ao de reserva
+QUALIDADE = {"avif": 55, "webp": 80}
+
+# Abaixo dessa largura de tela o Streamlit empilha as colunas
+LARGURA_EMPILHADA = 640
+
+
+def formatos_disponiveis():
+    """Formatos suportados pelo Pillow instalado, do preferido ao de reserva"""
+    from PIL import features
+
+    return [f for f in QUALIDADE if f == "webp" or features.check(f)]
+
+
+def _transparente(imagem):
+    """Se algum pixel não é opaco (PNGs RGBA costumam ter o canal alfa todo em 255)"""
+    if not imagem.has_transparency_data:
+        return False
+    return imagem.convert("RGBA").getchannel("A").getextrema()[0] < 255
+
+
+def _gravar(imagem, destino, formato):
+    temporario = destino + ".tmp"
+    opcoes = {"quality": QUALIDADE[formato]}
+    if formato == "webp":
+        opcoes["method"] = 6
+    imagem.save(temporario, format=formato.upper(), **opcoes)
+    os.replace(temporario, destino)
+
+
+def gerar_variantes(caminho, larguras=LARGURAS, destino=DIRETORIO_VARIANTES):
+    """Grava as variantes que ainda não existem.
+
+    Retorna {formato: [(largura, nome do arquivo), ...]}, em ordem crescente
+    de largura, e a largura original. Nenhuma variante é maior que o original.
+    """
+    from PIL import Image, ImageOps
+
+    base = os.path.splitext(os.path.basename(caminho))[0]
+    assinatura = hash_arquivo(caminho)[:12]
+    os.makedirs(destino, exist_ok=True)
+
+    with Image.open(caminho) as original:
+        original = ImageOps.exif_transpose(original)
+        largura_original, altura_original = original.size
+        imagem = original.convert("RGBA" if _transparente(original) else "RGB")
+
+        tamanhos = sorted({min(l, largura_original) for l in larguras})
+        variantes = {}
+        for formato in formatos_disponiveis():
+            variantes[formato] = []
+            for largura in tamanhos:
+                nome = f"{base}-{assinatura}-{largura}.{formato}"
+                arquivo = os.path.join(destino, nome)
+                if not os.path.exists(arquivo):
+                    altura = round(altura_original * largura / largura_original)
+                    reduzida = imagem if largura == largura_original else imagem.resize(
+                        (largura, altura), Image.Resampling.LANCZOS)
+                    _gravar(reduzida, arquivo, formato)
+                variantes[formato].append((largura, nome))
+    return variantes, largura_original
+
+
+@st.cache_resource(show_spinner="Preparando as imagens...")
+def variantes(caminho):
+    """gerar_variantes() de uma imagem, uma vez por processo"""
+    return gerar_variantes(caminho)
+
+
+def _srcset(lista):
+    return ", ".join(f"{URL_VARIANTES}/{nome} {largura}w" for largura, nome in lista)
+
+
+def mostrar_imagem(caminho, caption=None, fracao_largura=1.0):
+    """Mostra uma imagem de assets/ pela variante adequada à largura da tela.
+
+    fracao_largura é a fração da largura da página ocupada pela imagem (ex.:
+    0.4 numa coluna de st.columns([3, 2])); vale 1 quando as colunas estão
+    empilhadas. Sem escrita em static/ (disco somente leitura), cai no
+    st.image com o arquivo original.
+    """
+    try:
+        por_formato, largura_original = variantes(os.path.join(RAIZ, caminho))
+    except OSError:
+        st.image(caminho, caption=caption, use_container_width=True)
+        return
+
+    sizes = f"(max-width: {LARGURA_EMPILHADA}px) 100vw, {round(100 * fracao_largura)}vw"
+    *preferidos, reserva = list(por_formato)
+    fontes = "".join(
+        f'<source type="image/{f}" srcset="{_srcset(por_formato[f])}" sizes="{sizes}">' for f in preferidos)
+    texto = html.escape(caption or "")
+    img = (f'<img src="{URL_VARIANTES}/{por_formato[reserva][-1][1]}" srcset="{_srcset(por_formato[reserva])}" '
+           f'sizes="{sizes}" alt="{texto}" loading="lazy" '
+           f'style="width: 100%; max-width: {largura_original}px; height: auto;">')
+    legenda = (f'<figcaption style="text-align: center; font-size: 0.875rem; opacity: 0.6;">{texto}</figcaption>'
+               if caption else "")
+    # Numa linha só: uma linha em branco no meio encerraria o bloco HTML do markdown
+    st.markdown(f'<figure style="margin: 0;"><picture>{fontes}{img}</picture>{legenda}</figure>',
+                unsafe_allow_html=True)
+
+
+if __name__ == "__main__":
+    for arquivo in sorted(os.listdir(DIRETORIO_ASSETS)):
+        caminho = os.path.join(DIRETORIO_ASSETS, arquivo)
+        por_formato, _ = gerar_variantes(caminho)
+        tamanhos = {f: sum(os.path.getsize(os.path.join(DIRETORIO_VARIANTES, n)) for _, n in lista) // 1024
+                    for f, lista in por_formato.items()}
+        print(f"{arquivo}: {os.path.getsize(caminho) // 1024} KB -> "
+              + ", ".join(f"{f} {kb} KB ({len(por_formato[f])} larguras)" for f, kb in tamanhos.items()))
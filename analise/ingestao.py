@@ -0,0 +1,233 @@
+"""Ingestão das planilhas de monitoramento com cache colunar em disco.
+
+Cada planilha é convertida uma única vez para Parquet. O nome do arquivo
+em cache carrega o hash SHA-256 do xlsx de origem, de modo que a planilha
+só é lida novamente pelo openpyxl quando o seu conteúdo muda, e a coluna
+de data usada no filtro, de modo que leituras com filtros diferentes não
+compartilham o mesmo arquivo.
+
+A leitura é feita em fluxo: as linhas são percorridas com o iterador do
+modo somente leitura e entregues em blocos já tipados, com projeção de
+colunas e descarte das linhas sem data válida. A memória de pico depende
+do tamanho do bloco, e não do da planilha.
+"""
+import glob
+import hashlib
+import os
+from itertools import chain, islice
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from analise.instrumentacao import medido
+
+DIRETORIO_CACHE = os.path.join("dados", ".cache")
+
+# Incrementar sempre que a forma de ler/tipar as planilhas mudar,
+# invalidando os arquivos Parquet gerados pela versão anterior.
+VERSAO_FORMATO = 3
+
+# Linhas por bloco na leitura em fluxo
+TAMANHO_BLOCO = 10_000
+
+# Quantas linhas do topo examinar à procura do cabeçalho
+LINHAS_CABECALHO = 20
+
+# Textos lidos como valor ausente (os mesmos que o read_excel reconhece)
+VALORES_AUSENTES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+]
+
+
+def hash_arquivo(caminho):
+    """Hash SHA-256 do conteúdo de um arquivo"""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _nome_cache(caminho):
+    return os.path.join(DIRETORIO_CACHE, os.path.splitext(os.path.basename(caminho))[0])
+
+
+def _variante(coluna_data):
+    if coluna_data is None:
+        return "todas"
+    return "data-" + hashlib.sha256(str(coluna_data).encode()).hexdigest()[:8]
+
+
+def _caminho_cache(caminho, hash_, coluna_data=None):
+    return _nome_cache(caminho) + f"-{_variante(coluna_data)}-v{VERSAO_FORMATO}-{hash_[:16]}.parquet"
+
+
+def _tipar_para_parquet(df):
+    """Garante que todas as colunas possam ser gravadas em Parquet.
+
+    Colunas com tipos misturados (ex.: números e textos na mesma coluna)
+    são convertidas para texto, preservando os valores ausentes.
+    """
+    df.columns = [str(c) for c in df.columns]
+    for coluna in df.columns:
+        if df[coluna].dtype != object:
+            continue
+        try:
+            pa.array(df[coluna], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[coluna] = df[coluna].where(df[coluna].isna(), df[coluna].astype(str))
+    return df
+
+
+def _chave(valor):
+    return str(valor).strip().lower()
+
+
+def _linhas_xlsx(caminho):
+    """Valores das linhas da primeira aba, lidos em fluxo"""
+    import openpyxl
+    livro = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        yield from livro.worksheets[0].iter_rows(values_only=True)
+    finally:
+        livro.close()
+
+
+def _valor_xls(celula, modo_data):
+    import xlrd
+    if celula.ctype == xlrd.XL_CELL_DATE:
+        valor = xlrd.xldate_as_datetime(celula.value, modo_data)
+        # Sem parte de data (dia zero do calendário do Excel): é só um horário
+        return valor.time() if celula.value < 1 else valor
+    if celula.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return None
+    if celula.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(celula.value)
+    return celula.value if celula.value != "" else None
+
+
+def _linhas_xls(caminho):
+    """Valores das linhas da primeira aba de um .xls (formato antigo).
+
+    O xlrd não lê células sob demanda: a aba fica inteira em memória, mas
+    os blocos gerados a partir dela continuam limitados.
+    """
+    import xlrd
+    livro = xlrd.open_workbook(caminho, on_demand=True)
+    try:
+        aba = livro.sheet_by_index(0)
+        for i in range(aba.nrows):
+            yield tuple(_valor_xls(c, livro.datemode) for c in aba.row(i))
+    finally:
+        livro.release_resources()
+
+
+def _eh_xls(caminho):
+    """Se o arquivo é do formato binário antigo (OLE2), qualquer que seja a extensão"""
+    with open(caminho, "rb") as f:
+        return f.read(8) == b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+def _nomes_colunas(cabecalho):
+    """Nomes das colunas como o pandas os daria (vazios e repetidos)"""
+    nomes, vistos = [], {}
+    for i, valor in enumerate(cabecalho):
+        nome = f"Unnamed: {i}" if valor is None else str(valor)
+        if nome in vistos:
+            vistos[nome] += 1
+            nome = f"{nome}.{vistos[nome]}"
+        else:
+            vistos[nome] = 0
+        nomes.append(nome)
+    return nomes
+
+
+def _bloco(linhas, nomes, coluna_data):
+    """DataFrame tipado de um bloco de linhas, sem as de data inválida"""
+    df = pd.DataFrame.from_records(linhas, columns=nomes)
+    # Como o read_excel: textos de ausência viram NaN e colunas de texto
+    # que são todas números são convertidas
+    for coluna in df.columns:
+        if df[coluna].dtype != object and not isinstance(df[coluna].dtype, pd.StringDtype):
+            continue
+        df[coluna] = df[coluna].mask(df[coluna].isin(VALORES_AUSENTES))
+        try:
+            df[coluna] = pd.to_numeric(df[coluna])
+        except (ValueError, TypeError):
+            pass
+    if coluna_data is not None:
+        df[coluna_data] = pd.to_datetime(df[coluna_data], errors="coerce")
+        df = df[df[coluna_data].notna()]
+        # Sem as linhas descartadas, colunas de inteiros podem deixar de ter NaN
+        for coluna in df.columns[df.dtypes == "float64"]:
+            valores = df[coluna].to_numpy()
+            if len(valores) and not np.isnan(valores).any() and (valores == np.round(valores)).all():
+                df[coluna] = valores.astype("int64")
+    return df
+
+
+def ler_em_blocos(caminho, colunas=None, coluna_data=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Lê a primeira aba de uma planilha em blocos de linhas.
+
+    O cabeçalho é a primeira linha do topo que contém "Estação" (algumas
+    exportações trazem linhas de relatório/filtro antes da tabela). Só as
+    colunas em colunas são mantidas (None mantém todas) e, se coluna_data
+    for dada, as linhas cuja data não pode ser interpretada são descartadas
+    já na leitura. Nomes são comparados sem espaços nas pontas e em
+    minúsculas. Gera DataFrames com os tipos já inferidos; sempre gera ao
+    menos um, mesmo que vazio.
+    """
+    linhas = _linhas_xls(caminho) if _eh_xls(caminho) else _linhas_xlsx(caminho)
+    topo = list(islice(linhas, LINHAS_CABECALHO))
+    inicio = next((i for i, linha in enumerate(topo) if any(_chave(v) == "estação" for v in linha)), 0)
+    nomes = _nomes_colunas(topo[inicio]) if topo else []
+
+    pedidas = None if colunas is None else {_chave(c) for c in colunas}
+    indices = [i for i, nome in enumerate(nomes) if pedidas is None or _chave(nome) in pedidas]
+    projetadas = [nomes[i] for i in indices]
+    data = next((n for n in projetadas if coluna_data is not None and _chave(n) == _chave(coluna_data)), None)
+
+    bloco, gerou = [], False
+    for linha in chain(topo[inicio + 1:], linhas):
+        valores = tuple(linha[i] if i < len(linha) else None for i in indices)
+        if all(v is None for v in valores):
+            continue
+        bloco.append(valores)
+        if len(bloco) == tamanho_bloco:
+            yield _bloco(bloco, projetadas, data)
+            bloco, gerou = [], True
+    if bloco or not gerou:
+        yield _bloco(bloco, projetadas, data)
+
+
+@medido("ingestao")
+def ler_planilha(caminho, coluna_data=None):
+    """Lê uma planilha usando o cache Parquet quando ele estiver atualizado.
+
+    Sem cache, a planilha é lida em blocos (ver ler_em_blocos), com o
+    descarte das linhas sem data válida em coluna_data. Cada coluna_data
+    tem o seu próprio arquivo em cache.
+    """
+    hash_ = hash_arquivo(caminho)
+    destino = _caminho_cache(caminho, hash_, coluna_data)
+    if os.path.exists(destino):
+        return pd.read_parquet(destino)
+
+    df = _tipar_para_parquet(pd.concat(ler_em_blocos(caminho, coluna_data=coluna_data), ignore_index=True))
+    try:
+        os.makedirs(DIRETORIO_CACHE, exist_ok=True)
+        # Remove versões antigas da mesma planilha e coluna_data antes de gravar a nova
+        # (e os arquivos de antes da coluna_data entrar no nome)
+        nome = glob.escape(_nome_cache(caminho))
+        for padrao in (f"{nome}-{_variante(coluna_data)}-v*.parquet", f"{nome}-v*.parquet"):
+            for antigo in glob.glob(padrao):
+                os.remove(antigo)
+        temporario = destino + ".tmp"
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, destino)
+    except OSError:
+        # Sem permissão de escrita (ex.: disco somente leitura): segue sem cache
+        pass
+    return df
@@ -0,0 +1,163 @@
+"""Cronometragem das seções e da camada de dados, para achar o que pesa.
+
+Trechos marcados com `intervalo(nome)` ou funções decoradas com
+`@medido(categoria)` viram intervalos (início, duração, profundidade) num
+registro da sessão. O painel da barra lateral resume a última execução da
+página e exporta tudo no formato de trace do Chrome (chrome://tracing ou
+ui.perfetto.dev).
+
+A medição fica desligada por padrão. Para ligá-la numa sessão, abra a página
+com ?debug=1 na URL; INSTRUMENTACAO=1 no ambiente liga para todas as
+sessões (e para o processo, fora do Streamlit). Enquanto nenhuma sessão a
+ligou, cada intervalo custa só a checagem de uma variável global.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+HABILITADA_AMBIENTE = os.environ.get("INSTRUMENTACAO", "") not in ("", "0")
+
+# Intervalos guardados por sessão (os mais antigos saem primeiro)
+MAXIMO_INTERVALOS = 20_000
+
+_CHAVE_SESSAO = "_instrumentacao"
+_NULO = nullcontext()
+
+# Verdadeiro a partir da primeira sessão que ligar a medição
+_em_uso = HABILITADA_AMBIENTE
+
+
+class Registro:
+    """Intervalos medidos de uma sessão (ou do processo, fora do Streamlit)"""
+
+    def __init__(self):
+        self.origem = time.perf_counter_ns()
+        self.intervalos = []
+        self.execucao = 0
+        self.pagina = None
+        self.inicio_execucao = self.origem
+        self._profundidade = threading.local()
+
+    def nova_execucao(self, pagina):
+        self.execucao += 1
+        self.pagina = pagina
+        self.inicio_execucao = time.perf_counter_ns()
+
+    @contextmanager
+    def intervalo(self, nome, categoria):
+        profundidade = getattr(self._profundidade, "valor", 0)
+        self._profundidade.valor = profundidade + 1
+        inicio = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            fim = time.perf_counter_ns()
+            self._profundidade.valor = profundidade
+            self.intervalos.append({
+                "nome": nome, "categoria": categoria, "execucao": self.execucao, "pagina": self.pagina,
+                "inicio_ns": inicio - self.origem, "duracao_ns": fim - inicio,
+                "profundidade": profundidade, "thread": threading.get_ident(),
+            })
+            if len(self.intervalos) > MAXIMO_INTERVALOS:
+                del self.intervalos[:len(self.intervalos) - MAXIMO_INTERVALOS]
+
+    def trace_chrome(self):
+        """Intervalos no formato JSON de trace do Chrome (eventos completos 'X')"""
+        eventos = [{
+            "name": i["nome"], "cat": i["categoria"], "ph": "X",
+            "ts": i["inicio_ns"] / 1000, "dur": i["duracao_ns"] / 1000,
+            "pid": os.getpid(), "tid": i["thread"],
+            "args": {"execucao": i["execucao"], "pagina": i["pagina"]},
+        } for i in self.intervalos]
+        return json.dumps({"traceEvents": eventos, "displayTimeUnit": "ms"})
+
+
+_registro_processo = Registro() if HABILITADA_AMBIENTE else None
+
+
+def _registro():
+    """Registro da sessão atual, ou None se a medição estiver desligada nela"""
+    if not _em_uso:
+        return None
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return _registro_processo
+    return st.session_state.get(_CHAVE_SESSAO)
+
+
+def iniciar(pagina):
+    """Abre uma nova execução da página; chamar no topo de cada página"""
+    global _em_uso
+    ligada = HABILITADA_AMBIENTE or st.query_params.get("debug") == "1"
+    if not ligada:
+        st.session_state.pop(_CHAVE_SESSAO, None)
+        return
+    _em_uso = True
+    registro = st.session_state.setdefault(_CHAVE_SESSAO, Registro())
+    registro.nova_execucao(pagina)
+
+
+def intervalo(nome, categoria="secao"):
+    """Contexto que mede o trecho como um intervalo (nada faz se desligada)"""
+    registro = _registro()
+    if registro is None:
+        return _NULO
+    return registro.intervalo(nome, categoria)
+
+
+def medido(categoria, nome=None):
+    """Decorador que mede cada chamada da função.
+
+    Acima de @st.cache_resource, mede também as chamadas atendidas pelo
+    cache (o intervalo curto mostra o acerto).
+    """
+    def decorador(funcao):
+        # Funções das páginas rodam em __main__; aparecem só pelo nome
+        modulo = funcao.__module__.removeprefix("analise.")
+        rotulo = nome or (funcao.__qualname__ if modulo == "__main__" else f"{modulo}.{funcao.__qualname__}")
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            registro = _registro()
+            if registro is None:
+                return funcao(*args, **kwargs)
+            with registro.intervalo(rotulo, categoria):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorador
+
+
+def exportar_trace(caminho):
+    """Grava o trace do registro do processo (INSTRUMENTACAO=1 fora do Streamlit)"""
+    if _registro_processo is None:
+        raise RuntimeError("Instrumentação desligada: defina INSTRUMENTACAO=1")
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(_registro_processo.trace_chrome())
+
+
+def painel():
+    """Resumo da última execução e download do trace, na barra lateral"""
+    registro = _registro()
+    if registro is None:
+        return
+    total_ms = (time.perf_counter_ns() - registro.inicio_execucao) / 1e6
+    ultimos = pd.DataFrame([i for i in registro.intervalos if i["execucao"] == registro.execucao],
+                           columns=["nome", "categoria", "duracao_ns", "profundidade"])
+    resumo = (ultimos.assign(ms=ultimos["duracao_ns"] / 1e6)
+              .groupby(["categoria", "nome"])["ms"].agg(chamadas="count", total_ms="sum", maximo_ms="max")
+              .sort_values("total_ms", ascending=False).reset_index())
+
+    with st.sidebar.expander("⏱️ Instrumentação", expanded=True):
+        st.caption(f"Execução {registro.execucao} de {registro.pagina}: {total_ms:.0f} ms no total. "
+                   "Seções reexecutadas sozinhas (fragmentos) ficam só no trace.")
+        st.dataframe(resumo.style.format({"total_ms": "{:.1f}", "maximo_ms": "{:.1f}"}),
+                     hide_index=True, use_container_width=True)
+        st.download_button("Baixar trace (Chrome/Perfetto)", registro.trace_chrome(),
+                           file_name=f"trace-{registro.pagina}-{registro.execucao}.json",
+                           mime="application/json")
@@ -0,0 +1,102 @@
+"""Índice de Qualidade das Águas (IQA) por estação e trimestre.
+
+As planilhas de IQA passam pela mesma ingestão das de monitoramento (cache
+Parquet, leitura em fluxo) e viram uma tabela longa e tipada, indexada por
+(estação, trimestre). A planilha de 2020 traz um valor por trimestre; a de
+2021 só o valor anual, que vale para os quatro trimestres do ano.
+
+A junção com as amostras é feita uma vez por versão dos dados: as posições
+de cada amostra na tabela de IQA ficam em cache, e as consultas seguintes
+são apenas um take.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analise.dados import COLUNA_DATA, amostras, normalizar_colunas, versao_dados
+from analise.esquema import aplicar_esquema
+from analise.ingestao import ler_planilha
+from analise.instrumentacao import medido
+
+ARQUIVO_IQA_2020 = "dados/IQA_trimestre_2020.xlsx"
+ARQUIVO_IQA_2021 = "dados/IQA 2021_Valores_Classes.xlsx"
+
+# Classes do IQA (IGAM), da pior para a melhor, e os limites superiores de cada faixa
+CLASSES_IQA = ['Muito Ruim', 'Ruim', 'Médio', 'Bom', 'Excelente']
+LIMITES_IQA = [0, 25, 50, 70, 90, 100]
+
+TIPO_CLASSE = pd.CategoricalDtype(CLASSES_IQA, ordered=True)
+
+
+def classificar_iqa(valores):
+    """Classe de cada valor de IQA (categórica ordenada)"""
+    return pd.cut(valores, LIMITES_IQA, labels=CLASSES_IQA, include_lowest=True).astype(TIPO_CLASSE)
+
+
+def trimestre(datas):
+    """Chave do trimestre de cada data (ex.: '2020T3')"""
+    return datas.dt.year.astype(str) + 'T' + datas.dt.quarter.astype(str)
+
+
+def _ler_iqa_2020(caminho=ARQUIVO_IQA_2020):
+    """IQA de cada trimestre de 2020 ('Não Calculado' vira NaN)"""
+    df = normalizar_colunas(ler_planilha(caminho))
+    colunas = {f'{i}º trimestre': f'2020T{i}' for i in range(1, 5)}
+    longo = df[['estação', *colunas]].rename(columns=colunas).melt(
+        id_vars='estação', var_name='trimestre', value_name='iqa')
+    longo['iqa'] = pd.to_numeric(longo['iqa'], errors='coerce')
+    return longo.assign(classe=classificar_iqa(longo['iqa']), origem='trimestral')
+
+
+def _ler_iqa_2021(caminho=ARQUIVO_IQA_2021):
+    """IQA anual de 2021, repetido nos quatro trimestres.
+
+    Os cabeçalhos da exportação estão trocados (IQA_2021 traz a classe e
+    IQA_Classe_2021 o valor); as colunas são identificadas pelo conteúdo.
+    """
+    df = normalizar_colunas(ler_planilha(caminho))
+    outras = df.drop(columns='estação')
+    numericas = outras.select_dtypes('number').columns
+    valor, classe = numericas[0], outras.columns.drop(numericas)[0]
+    anual = pd.DataFrame({
+        'estação': df['estação'],
+        'iqa': df[valor].astype(float),
+        'classe': df[classe].str.strip().astype(TIPO_CLASSE),
+    })
+    trimestres = [f'2021T{i}' for i in range(1, 5)]
+    return (anual.loc[anual.index.repeat(len(trimestres))]
+            .assign(trimestre=np.tile(trimestres, len(anual)), origem='anual'))
+
+
+@medido("dados")
+@st.cache_resource(show_spinner="Carregando o IQA...")
+def tabela_iqa():
+    """IQA e classe por (estação, trimestre), com índice ordenado"""
+    tabela = pd.concat([_ler_iqa_2020(), _ler_iqa_2021()], ignore_index=True)
+    tabela['estação'] = tabela['estação'].str.strip()
+    tabela = aplicar_esquema(tabela.dropna(subset=['estação']))
+    return tabela.set_index(['estação', 'trimestre']).sort_index()[['iqa', 'classe', 'origem']]
+
+
+@st.cache_resource(max_entries=4)
+def _posicoes_iqa(versao):
+    """Linha da tabela de IQA de cada amostra (-1 se não houver).
+
+    versao (de analise.dados.versao_dados) só entra na chave do cache.
+    """
+    base = amostras()
+    chaves = pd.MultiIndex.from_arrays([base['estação'].astype(str), trimestre(base[COLUNA_DATA])])
+    return tabela_iqa().index.get_indexer(chaves)
+
+
+@medido("dados")
+def iqa_amostras():
+    """IQA e classe do trimestre de cada amostra, alinhados a amostras()"""
+    posicoes = _posicoes_iqa(versao_dados())
+    tabela = tabela_iqa()
+    encontrada = posicoes >= 0
+    iqa = np.full(len(posicoes), np.nan, dtype=np.float32)
+    iqa[encontrada] = tabela['iqa'].to_numpy()[posicoes[encontrada]]
+    classe = pd.Categorical.from_codes(
+        np.where(encontrada, tabela['classe'].cat.codes.to_numpy()[posicoes], -1), dtype=TIPO_CLASSE)
+    return pd.DataFrame({'iqa': iqa, 'classe_iqa': classe}, index=amostras().index)
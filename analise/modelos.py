@@ -0,0 +1,250 @@
+"""Modelos de regressão da turbidez e suas bandas de previsão.
+
+O scipy só é importado dentro das funções que usam a distribuição t, para
+não pesar na abertura das páginas que importam este módulo.
+"""
+import numpy as np
+import pandas as pd
+
+from analise.instrumentacao import medido
+
+# Situação de cada estação em relação ao limite (coluna 'situacao_limite' de ajustar_por_estacao)
+JA_ABAIXO = 'já abaixo'
+ATINGE = 'atinge'
+QUEDA_NAO_SIGNIFICATIVA = 'queda não significativa'
+NAO_ATINGE = 'não atinge'
+
+
+def caracteristicas(modelo, X):
+    """Matriz vista pelo regressor final e o próprio regressor.
+
+    Para pipelines (ex.: PolynomialFeatures + LinearRegression) aplica todas
+    as etapas de transformação; para um regressor simples devolve X.
+    """
+    if hasattr(modelo, 'steps'):
+        return modelo[:-1].transform(X), modelo[-1]
+    return np.asarray(X, dtype=float), modelo
+
+
+class _Desenho:
+    """Base ortonormal do espaço das colunas da matriz de desenho.
+
+    Colunas constantes (ex.: o termo de viés do PolynomialFeatures) são
+    descartadas e substituídas por um único intercepto; as demais são
+    padronizadas, o que não altera as alavancagens mas melhora muito o
+    condicionamento de potências de anos (~2020²). A decomposição SVD
+    fina ocupa memória O(n·p) e revela a posto efetivo da matriz.
+    """
+
+    def __init__(self, F):
+        F = np.asarray(F, dtype=float).reshape(len(F), -1)
+        desvio = F.std(axis=0)
+        self.colunas = desvio > 0
+        self.centro = F[:, self.colunas].mean(axis=0)
+        self.escala = desvio[self.colunas]
+        _, s, Vt = np.linalg.svd(self._montar(F), full_matrices=False)
+        self.posto = int(np.sum(s > s[0] * max(F.shape) * np.finfo(float).eps))
+        self._projecao = Vt[:self.posto].T / s[:self.posto]
+
+    def _montar(self, F):
+        F = np.asarray(F, dtype=float).reshape(len(F), -1)
+        Z = (F[:, self.colunas] - self.centro) / self.escala
+        return np.column_stack([np.ones(len(F)), Z])
+
+    def alavancagens(self, F):
+        Z = self._montar(F) @ self._projecao
+        return np.einsum('ij,ij->i', Z, Z)
+
+
+def _variancia_residual(modelo, X, y, desenho):
+    """Valores ajustados, variância residual e graus de liberdade"""
+    ajustados = modelo.predict(X)
+    residuos = y - ajustados
+    gl = len(y) - desenho.posto
+    return ajustados, residuos @ residuos / gl, gl
+
+
+def bandas_previsao(modelo, X, y, X_novo, alfa=0.05):
+    """Previsões e banda de previsão (1 - alfa) de um modelo já ajustado.
+
+    Vale para LinearRegression e para pipelines de (StandardScaler +)
+    PolynomialFeatures + LinearRegression de qualquer grau. Os resíduos são calculados uma única
+    vez; os valores ajustados em X também são devolvidos para reutilização
+    (ex.: gráfico de resíduos).
+
+    Retorna (previsoes, inferior, superior, ajustados).
+    """
+    from scipy.stats import t
+
+    F, _ = caracteristicas(modelo, X)
+    F_novo, _ = caracteristicas(modelo, X_novo)
+    desenho = _Desenho(F)
+    ajustados, mse, gl = _variancia_residual(modelo, X, y, desenho)
+
+    previsoes = modelo.predict(X_novo)
+    erro = np.sqrt(mse * (1 + desenho.alavancagens(F_novo)))
+    t_val = t.ppf(1 - alfa/2, gl)
+    return previsoes, previsoes - t_val * erro, previsoes + t_val * erro, ajustados
+
+
+@medido("modelo")
+def ajustar_por_estacao(df, x='ano_decimal', y='turbidez', grupo='estação', limite=5.0, alfa=0.05):
+    """Ajusta uma regressão linear simples de y em x para cada estação.
+
+    Todos os modelos são ajustados de uma só vez pelas equações normais
+    agrupadas: as somas por grupo saem de np.bincount sobre os códigos da
+    estação, sem laço em Python nem um ajuste do sklearn por grupo. As somas
+    são centradas na média de cada grupo para evitar cancelamento numérico.
+
+    Retorna uma tabela com a inclinação, o intercepto, o intervalo de
+    confiança (1 - alfa) da inclinação, o p-valor, o R², a situação em
+    relação ao limite e o ano em que a tendência o atinge, com o seu
+    intervalo de confiança pelo método delta. O ano só é dado na situação
+    ATINGE: queda significativa a alfa e cruzamento depois da última
+    amostra. Nas demais (JA_ABAIXO na última amostra, NAO_ATINGE sem
+    queda, QUEDA_NAO_SIGNIFICATIVA, em que o intervalo do ano não é
+    limitado) ele fica NaN.
+    """
+    from scipy.stats import t
+
+    dados = df[[grupo, x, y]].dropna()
+    codigos, estacoes = dados[grupo].factorize(sort=True)
+    k = len(estacoes)
+    xs = dados[x].to_numpy(dtype=float)
+    ys = dados[y].to_numpy(dtype=float)
+
+    n = np.bincount(codigos, minlength=k).astype(float)
+    media_x = np.bincount(codigos, xs, k) / n
+    media_y = np.bincount(codigos, ys, k) / n
+    dx = xs - media_x[codigos]
+    dy = ys - media_y[codigos]
+    sxx = np.bincount(codigos, dx * dx, k)
+    sxy = np.bincount(codigos, dx * dy, k)
+    syy = np.bincount(codigos, dy * dy, k)
+    ultimo = np.full(k, -np.inf)
+    np.maximum.at(ultimo, codigos, xs)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        valido = (n > 2) & (sxx > 0)
+        inclinacao = np.where(valido, sxy / sxx, np.nan)
+        intercepto = media_y - inclinacao * media_x
+        gl = n - 2
+        sse = np.maximum(syy - inclinacao * sxy, 0)
+        erro_padrao = np.sqrt(sse / gl / sxx)
+        t_val = t.ppf(1 - alfa/2, gl)
+        estatistica_t = inclinacao / erro_padrao
+        p_valor = 2 * t.sf(np.abs(estatistica_t), gl)
+        r2 = 1 - sse / syy
+        abaixo = intercepto + inclinacao * ultimo <= limite
+        queda = (inclinacao < 0) & ~abaixo
+        situacao = np.select([~valido | np.isnan(limite), abaixo, ~queda, p_valor >= alfa],
+                             [None, JA_ABAIXO, NAO_ATINGE, QUEDA_NAO_SIGNIFICATIVA], ATINGE)
+        ano_limite = np.where(situacao == ATINGE, (limite - intercepto) / inclinacao, np.nan)
+        # Var(t*) = s²·(1/n + (t* - x̄)²/Sxx) / b²
+        erro_ano = np.sqrt(sse / gl * (1 / n + (ano_limite - media_x) ** 2 / sxx)) / np.abs(inclinacao)
+
+    return pd.DataFrame({
+        grupo: estacoes,
+        'n': n.astype(int),
+        'inclinacao': inclinacao,
+        'intercepto': intercepto,
+        'ic_inclinacao_inferior': inclinacao - t_val * erro_padrao,
+        'ic_inclinacao_superior': inclinacao + t_val * erro_padrao,
+        'p_valor': p_valor,
+        'r2': r2,
+        'situacao_limite': situacao,
+        'ano_limite': ano_limite,
+        'ano_limite_inferior': ano_limite - t_val * erro_ano,
+        'ano_limite_superior': ano_limite + t_val * erro_ano,
+    })
+
+
+def _menor_raiz(c):
+    """Menor raiz real em (0, 1] de cada linha de c (NaN se não houver)"""
+    grau = c.shape[-1] - 1
+    u = np.full(c.shape[:-1], np.nan)
+    if grau == 0 or c.size == 0:
+        return u
+    # Coeficiente líder desprezível: resolve como polinômio de grau menor
+    degenerado = np.abs(c[..., -1]) <= 1e-12 * np.abs(c).max(axis=-1)
+    if degenerado.any():
+        u[degenerado] = _menor_raiz(c[degenerado][:, :-1])
+    ok = ~degenerado
+    c = c[ok]
+
+    if grau == 1:
+        raizes = (-c[:, 0] / c[:, 1])[:, None]
+        reais = np.ones(raizes.shape, dtype=bool)
+    else:
+        companheira = np.zeros((len(c), grau, grau))
+        companheira[:, np.arange(1, grau), np.arange(grau - 1)] = 1
+        companheira[:, :, -1] = -c[:, :-1] / c[:, -1:]
+        raizes = np.linalg.eigvals(companheira)
+        reais = np.abs(raizes.imag) <= 1e-9 * (1 + np.abs(raizes.real))
+        raizes = raizes.real
+    candidatas = np.where(reais & (raizes > 0) & (raizes <= 1), raizes, np.inf).min(axis=-1)
+    u[ok] = np.where(np.isfinite(candidatas), candidatas, np.nan)
+    return u
+
+
+def raizes_limite(coeficientes, limite):
+    """Primeiro u em [0, 1] em que o polinômio p(u) fica ≤ limite.
+
+    coeficientes tem forma (..., grau + 1), em potências crescentes de u,
+    e é combinado por broadcasting com limite, permitindo resolver vários
+    modelos e/ou vários limites de uma só vez. As raízes vêm dos autovalores
+    das matrizes companheiras empilhadas (fórmula fechada no caso linear).
+    Retorna 0 onde p(0) já está abaixo do limite e NaN onde não há
+    cruzamento no intervalo.
+    """
+    c = np.asarray(coeficientes, dtype=float)
+    limite = np.asarray(limite, dtype=float)
+    forma = np.broadcast_shapes(c.shape[:-1], limite.shape)
+    c = np.broadcast_to(c, forma + c.shape[-1:]).copy()
+    c[..., 0] -= limite
+    return np.where(c[..., 0] <= 0, 0.0, _menor_raiz(c))
+
+
+def _grau(modelo):
+    if hasattr(modelo, 'steps'):
+        return next(etapa.degree for _, etapa in modelo.steps if hasattr(etapa, 'degree'))
+    return 1
+
+
+def cruzamento_limite(modelo, X, y, limite=5.0, inicio=2019.0, fim=2031.0, alfa=0.05):
+    """Ano em que a tendência do modelo atinge o limite de turbidez.
+
+    O cruzamento é resolvido de forma exata (sem varredura de grade) no
+    intervalo [inicio, fim]; limite pode ser um vetor de limites. O
+    intervalo de confiança (1 - alfa) do ano vem do método delta:
+    Var(t*) = s²·h(t*) / p'(t*)², onde h é a alavancagem do ponto.
+
+    Retorna (ano, inferior, superior); NaN onde não há cruzamento. Se a
+    tendência já estiver abaixo do limite em inicio, o ano é inicio e o
+    intervalo fica indefinido.
+    """
+    from scipy.stats import t
+
+    # Coeficientes na variável local u = (ano - inicio) / (fim - inicio),
+    # interpolando o modelo em nós de Chebyshev: evita o mau condicionamento
+    # das potências de anos (~2020²) dos coeficientes brutos.
+    grau = _grau(modelo)
+    amplitude = fim - inicio
+    nos = (1 - np.cos(np.pi * (np.arange(grau + 1) + 0.5) / (grau + 1))) / 2
+    valores = modelo.predict((inicio + nos * amplitude).reshape(-1, 1))
+    coeficientes = np.linalg.solve(np.vander(nos, grau + 1, increasing=True), valores)
+
+    u = raizes_limite(coeficientes, limite)
+    ano = inicio + u * amplitude
+
+    F, _ = caracteristicas(modelo, X)
+    desenho = _Desenho(F)
+    _, mse, gl = _variancia_residual(modelo, X, y, desenho)
+    u_valido = np.nan_to_num(u)
+    derivada = np.polynomial.polynomial.polyval(u_valido, np.polynomial.polynomial.polyder(coeficientes)) / amplitude
+    F_ano, _ = caracteristicas(modelo, (inicio + u_valido * amplitude).reshape(-1, 1))
+    h = desenho.alavancagens(F_ano).reshape(np.shape(u))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        erro = np.where(u > 0, np.sqrt(mse * h) / np.abs(derivada), np.nan)
+    t_val = t.ppf(1 - alfa/2, gl)
+    return ano, ano - t_val * erro, ano + t_val * erro
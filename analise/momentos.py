@@ -0,0 +1,105 @@
+"""Estatísticas descritivas de todas as colunas numéricas de uma vez.
+
+Contagem, média, desvio padrão, quantis, assimetria, curtose e o teste de
+normalidade de D'Agostino-Pearson (K²) são calculados numa única passada
+vetorizada sobre a matriz do período, em vez de um describe, um skew e um
+normaltest por variável. A tabela fica em cache por período; trocar a
+variável selecionada é só um .loc.
+
+Assimetria e curtose seguem os padrões do scipy.stats (estimadores
+enviesados, curtose de Fisher); K² reproduz scipy.stats.normaltest.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analise.dados import dados_periodo
+from analise.instrumentacao import medido
+
+# Colunas da tabela, na ordem do describe seguida das do scipy
+COLUNAS_DESCRITIVAS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max', 'skewness', 'kurtosis']
+COLUNAS_NORMALIDADE = ['k2', 'p_normalidade']
+
+# Mínimo de observações do teste de assimetria (o de curtose exige 5)
+MINIMO_NORMALIDADE = 8
+
+
+def _z_assimetria(g1, n):
+    """Estatística z do teste de assimetria (scipy.stats.skewtest)"""
+    y = g1 * np.sqrt((n + 1) * (n + 3) / (6.0 * (n - 2)))
+    beta2 = 3.0 * (n * n + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+    w2 = -1 + np.sqrt(2 * (beta2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w2))
+    alfa = np.sqrt(2.0 / (w2 - 1))
+    y = np.where(y == 0, 1, y)
+    return delta * np.log(y / alfa + np.sqrt((y / alfa) ** 2 + 1))
+
+
+def _z_curtose(b2, n):
+    """Estatística z do teste de curtose (scipy.stats.kurtosistest); b2 é a curtose de Pearson"""
+    esperado = 3.0 * (n - 1) / (n + 1)
+    variancia = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+    x = (b2 - esperado) / np.sqrt(variancia)
+    raiz_beta1 = (6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9))
+                  * np.sqrt(6.0 * (n + 3) * (n + 5) / (n * (n - 2) * (n - 3))))
+    a = 6.0 + 8.0 / raiz_beta1 * (2.0 / raiz_beta1 + np.sqrt(1 + 4.0 / raiz_beta1 ** 2))
+    termo1 = 1 - 2 / (9.0 * a)
+    denominador = 1 + x * np.sqrt(2 / (a - 4.0))
+    termo2 = np.sign(denominador) * np.where(
+        denominador == 0, np.nan, np.cbrt((1 - 2.0 / a) / np.abs(denominador)))
+    return (termo1 - termo2) / np.sqrt(2 / (9.0 * a))
+
+
+def momentos(df):
+    """Tabela descritiva das colunas numéricas de df, uma linha por coluna.
+
+    Valores ausentes são ignorados coluna a coluna (como no describe). O
+    teste de normalidade fica NaN nas colunas com menos de
+    MINIMO_NORMALIDADE observações ou sem variação.
+    """
+    numericas = df.select_dtypes(include='number')
+    x = numericas.to_numpy(dtype=float)
+    presente = ~np.isnan(x)
+    n = presente.sum(axis=0).astype(float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.where(presente, x, 0.0).sum(axis=0) / n
+        desvio = np.where(presente, x - media, 0.0)
+        quadrado = desvio * desvio
+        m2 = quadrado.sum(axis=0) / n
+        m3 = (quadrado * desvio).sum(axis=0) / n
+        m4 = (quadrado * quadrado).sum(axis=0) / n
+        # Coluna constante: momentos de ordem 3 e 4 sem sentido (o scipy também dá NaN)
+        constante = m2 <= (10 * np.finfo(float).resolution * media) ** 2
+        g1 = np.where(constante, np.nan, m3 / m2 ** 1.5)
+        b2 = np.where(constante, np.nan, m4 / m2 ** 2)
+        desvio_padrao = np.sqrt(m2 * n / (n - 1))
+
+        k2 = _z_assimetria(g1, n) ** 2 + _z_curtose(b2, n) ** 2
+        k2 = np.where(n >= MINIMO_NORMALIDADE, k2, np.nan)
+
+    # Quantis num único sort da matriz; colunas vazias ficam NaN sem aviso
+    quantis = np.full((5, x.shape[1]), np.nan)
+    com_dados = n > 0
+    if com_dados.any():
+        quantis[:, com_dados] = np.nanquantile(x[:, com_dados], [0, 0.25, 0.5, 0.75, 1], axis=0)
+
+    tabela = pd.DataFrame({
+        'count': n, 'mean': media, 'std': desvio_padrao,
+        'min': quantis[0], '25%': quantis[1], '50%': quantis[2], '75%': quantis[3], 'max': quantis[4],
+        'skewness': g1, 'kurtosis': b2 - 3,
+        # Qui-quadrado com 2 g.l.: a cauda é exp(-k2 / 2)
+        'k2': k2, 'p_normalidade': np.exp(-k2 / 2),
+    }, index=numericas.columns)
+    tabela.index.name = 'variável'
+    return tabela
+
+
+@medido("estatistica")
+@st.cache_resource(max_entries=32, show_spinner="Calculando estatísticas descritivas...")
+def momentos_periodo(periodo):
+    """Tabela de momentos() de um período, em cache (as partições não mudam).
+
+    Compartilhada entre sessões; não deve ser modificada.
+    """
+    return momentos(dados_periodo(periodo))
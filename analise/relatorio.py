@@ -0,0 +1,268 @@
+"""Relatório em lote das análises da página de estudo, sem servidor.
+
+Para cada período (e todos juntos), estação (e todas juntas) e parâmetro,
+reúne as análises da página de estudo:
+
+- tendência linear no tempo e ano em que ela atinge o limite do parâmetro
+  (a previsão da turbidez, estação por estação);
+- teste t da estação contra as demais estações;
+- teste t unicaudal da média contra o limite (H1: média > limite);
+- conformidade ao limite, com intervalo exato e teste binomial.
+
+Cada tarefa do pool de processos é um par (período, parâmetro) e cobre
+todas as estações de uma vez, com as mesmas funções vetorizadas usadas pela
+página. O resultado completo vai para um Parquet, uma linha por combinação,
+e o resumo para um HTML estático. Parâmetros sem limite conhecido ficam sem
+o teste contra o limite e sem a conformidade (ver --limite).
+
+Uso:
+    python -m analise.relatorio [--saida relatorios] [--parametros turbidez ...]
+                                [--limite "sólidos totais=500"] [--trabalhadores N]
+"""
+import argparse
+import datetime
+import html
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analise.agregados import agregar, descontar, intervalo_confianca, resumir, somar, teste_t, teste_t_referencia
+from analise.comparacao import ESTACOES_INTERESSE
+from analise.conformidade import PROPORCAO_ESPERADA, TurbidezOrdenada, avaliar
+from analise.dados import COLUNA_DATA
+from analise.modelos import ajustar_por_estacao
+from analise.temporal import TODAS_ESTACOES
+from analise.turbidez import LIMITE_EXCELENTE
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAIDA_PADRAO = os.path.join(RAIZ, "relatorios")
+
+# Limite de cada parâmetro: H0 do teste t e critério de conformidade
+LIMITES = {'turbidez': LIMITE_EXCELENTE}
+
+# Período que reúne todas as amostras
+TODOS_PERIODOS = 'todos'
+
+SIGNIFICANCIA = 0.05
+
+# Linhas das tabelas de destaque do HTML
+LINHAS_DESTAQUE = 10
+
+# Coluna do Parquet -> (título no HTML, formato)
+COLUNAS_HTML = {
+    'periodo': ("Período", None),
+    'estação': ("Estação", None),
+    'n': ("Amostras", "{:.0f}"),
+    'media': ("Média", "{:.2f}"),
+    'ic_media_inferior': ("IC 95% inferior", "{:.2f}"),
+    'ic_media_superior': ("IC 95% superior", "{:.2f}"),
+    'inclinacao': ("Inclinação (/ano)", "{:.3f}"),
+    'p_valor_tendencia': ("Valor p (tendência)", "{:.4f}"),
+    'situacao_limite': ("Situação do limite", None),
+    'ano_limite': ("Ano ≤ limite", "{:.1f}"),
+    'p_valor_demais': ("Valor p (vs. demais)", "{:.4f}"),
+    'p_valor_limite': ("Valor p (média > limite)", "{:.4f}"),
+    'proporcao': ("Proporção conforme", "{:.1%}"),
+    'p_valor_binomial': ("Valor p (binomial)", "{:.4f}"),
+}
+
+
+def analisar(df, parametro, limite=None):
+    """Análises de um parâmetro em cada estação de df e em todas juntas.
+
+    Retorna um quadro indexado pela estação, com TODAS_ESTACOES na última
+    linha. Estações sem o parâmetro medido ficam de fora; a conformidade
+    conta só as amostras com o parâmetro medido.
+    """
+    limite = np.nan if limite is None else float(limite)
+    todas = df.assign(**{'estação': TODAS_ESTACOES})
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        celulas = agregar(df, 'estação', [parametro]).loc[parametro]
+        total = somar(celulas)
+        resumo = resumir(pd.concat([celulas, total.to_frame(TODAS_ESTACOES).T]))
+        # Cada estação contra as demais; para todas juntas não há com quem comparar
+        demais = resumir(descontar(total, resumo))
+        ic_inferior, ic_superior, _ = intervalo_confianca(resumo)
+        t_demais, p_demais = teste_t(resumo, demais)
+        t_limite, p_limite = teste_t_referencia(resumo, limite)
+
+        tendencias = pd.concat([ajustar_por_estacao(df, y=parametro, limite=limite),
+                                ajustar_por_estacao(todas, y=parametro, limite=limite)])
+
+    resultado = resumo[['n', 'media', 'desvio_padrao']].astype({'n': int}).assign(
+        ic_media_inferior=ic_inferior, ic_media_superior=ic_superior,
+        t_demais=t_demais, p_valor_demais=p_demais,
+        limite=limite, t_limite=t_limite, p_valor_limite=p_limite)
+    resultado = resultado.join(tendencias.drop(columns='n').rename(columns={'p_valor': 'p_valor_tendencia'})
+                               .set_index('estação'))
+
+    if np.isnan(limite):
+        return resultado
+    ordenada = TurbidezOrdenada(df.dropna(subset=[parametro]), coluna=parametro)
+    conformidade = pd.concat([ordenada.conformidade([limite], por=('estação',)),
+                              ordenada.conformidade([limite], por=()).assign(**{'estação': TODAS_ESTACOES})])
+    conformidade = avaliar(conformidade).set_index('estação').rename(columns={
+        'ic_inferior': 'ic_proporcao_inferior', 'ic_superior': 'ic_proporcao_superior',
+        'p_valor': 'p_valor_binomial'})
+    return resultado.join(conformidade.drop(columns=['limite', 'total']))
+
+
+def _tarefa(periodo, parametro, df, limite):
+    """Uma tarefa do pool: todas as estações de um período para um parâmetro"""
+    resultado = analisar(df, parametro, limite).rename_axis('estação').reset_index()
+    resultado.insert(0, 'parametro', parametro)
+    resultado.insert(0, 'periodo', periodo)
+    return resultado
+
+
+def calcular(por_periodo, parametros, limites=LIMITES, trabalhadores=None):
+    """Quadro com todas as combinações (período, estação, parâmetro).
+
+    por_periodo mapeia a chave de cada período ao seu quadro de amostras.
+    As tarefas (período, parâmetro) rodam num pool de processos; cada uma
+    recebe só as colunas de que precisa.
+    """
+    tarefas = [(periodo, parametro, df[['estação', COLUNA_DATA, 'ano_decimal', parametro]], limites.get(parametro))
+               for periodo, df in por_periodo.items() for parametro in parametros]
+
+    trabalhadores = min(trabalhadores or os.cpu_count() or 1, len(tarefas))
+    if trabalhadores <= 1:
+        partes = [_tarefa(*t) for t in tarefas]
+    else:
+        # spawn, como nos demais pools do projeto: o processo pai pode ter várias threads
+        with ProcessPoolExecutor(trabalhadores, mp_context=multiprocessing.get_context("spawn")) as pool:
+            partes = list(pool.map(_tarefa, *zip(*tarefas)))
+
+    resultado = pd.concat(partes, ignore_index=True)
+    for coluna in ('periodo', 'parametro'):
+        resultado[coluna] = pd.Categorical(resultado[coluna], categories=list(dict.fromkeys(resultado[coluna])))
+    return resultado
+
+
+def _tabela(quadro, rotulos):
+    colunas = [c for c in COLUNAS_HTML if c in quadro.columns]
+    quadro = quadro[colunas].assign(periodo=quadro['periodo'].map(rotulos)) if 'periodo' in colunas else quadro[colunas]
+    formatos = {COLUNAS_HTML[c][0]: COLUNAS_HTML[c][1] for c in colunas if COLUNAS_HTML[c][1]}
+    estilo = (quadro.rename(columns={c: COLUNAS_HTML[c][0] for c in colunas}).style
+              .format(formatos, na_rep="—").hide(axis='index'))
+    return estilo.to_html()
+
+
+def gerar_html(resultado, rotulos, titulo="Relatório da qualidade da água", observacoes=()):
+    """HTML estático com o resumo de cada parâmetro.
+
+    Para cada parâmetro: todas as estações juntas em cada período, as
+    estações de interesse e as estações que mais diferem das demais (e, com
+    limite, as de menor conformidade) no período completo. O detalhe de cada
+    combinação fica no Parquet.
+    """
+    partes = []
+    for parametro, linhas in resultado.groupby('parametro', observed=True, sort=False):
+        limite = linhas['limite'].iloc[0]
+        subtitulo = html.escape(parametro) + ("" if np.isnan(limite) else f" (limite {limite:g})")
+        partes.append(f'<h2 class="section-title">{subtitulo}</h2>')
+
+        partes.append("<h3>Todas as estações</h3>")
+        partes.append(_tabela(linhas[linhas['estação'] == TODAS_ESTACOES], rotulos))
+
+        partes.append(f"<h3>Estações de interesse ({', '.join(ESTACOES_INTERESSE)})</h3>")
+        partes.append(_tabela(linhas[linhas['estação'].isin(ESTACOES_INTERESSE)]
+                              .sort_values(['estação', 'periodo']), rotulos))
+
+        completo = linhas[(linhas['periodo'] == TODOS_PERIODOS) & (linhas['estação'] != TODAS_ESTACOES)]
+        diferentes = completo[completo['p_valor_demais'] < SIGNIFICANCIA].nsmallest(LINHAS_DESTAQUE, 'p_valor_demais')
+        partes.append(f"<h3>Estações que mais diferem das demais ({html.escape(rotulos[TODOS_PERIODOS])})</h3>")
+        partes.append(_tabela(diferentes, rotulos))
+
+        if 'proporcao' in completo and not np.isnan(limite):
+            partes.append(f"<h3>Menor conformidade ({html.escape(rotulos[TODOS_PERIODOS])})</h3>")
+            partes.append(_tabela(completo.nsmallest(LINHAS_DESTAQUE, 'proporcao'), rotulos))
+
+    notas = "".join(f"<li>{html.escape(o)}</li>" for o in observacoes)
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(titulo)}</title>
+<style>
+    body {{ font-family: sans-serif; margin: 2rem; color: #2c3e50; }}
+    .section-title {{ color: #3498db; border-bottom: 2px solid #3498db; padding-bottom: 0.3rem; margin-top: 2.5rem; }}
+    table {{ border-collapse: collapse; font-size: 0.85rem; margin-bottom: 1rem; }}
+    th, td {{ padding: 0.3rem 0.6rem; border-bottom: 1px solid #e0e0e0; text-align: right; }}
+    th {{ background-color: #f0f2f6; }}
+</style>
+</head>
+<body>
+<h1>💧 {html.escape(titulo)}</h1>
+<ul>{notas}</ul>
+{"".join(partes)}
+</body>
+</html>
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--saida", default=SAIDA_PADRAO, help="pasta do relatorio.parquet e do relatorio.html")
+    parser.add_argument("--parametros", nargs="+", help="colunas analisadas (padrão: todas as numéricas)")
+    parser.add_argument("--limite", action="append", default=[], metavar="PARAMETRO=VALOR",
+                        help="limite de um parâmetro (pode repetir)")
+    parser.add_argument("--trabalhadores", type=int, help="processos do pool (padrão: um por CPU)")
+    args = parser.parse_args(argv)
+
+    limites = dict(LIMITES)
+    for item in args.limite:
+        parametro, _, valor = item.rpartition("=")
+        try:
+            limites[parametro] = float(valor)
+        except ValueError:
+            parser.error(f"limite inválido: {item!r} (use PARAMETRO=VALOR)")
+
+    from streamlit.logger import set_log_level
+
+    # Sem servidor, o cache do Streamlit avisa a cada chamada que não há sessão
+    set_log_level("error")
+    from analise.dados import _colunas_numericas, amostras, periodos, rotulo_periodo, versao_dados
+
+    inicio = time.perf_counter()
+    base = amostras()
+    disponiveis = _colunas_numericas(base)
+    parametros = args.parametros or disponiveis
+    desconhecidos = sorted(set(parametros) - set(disponiveis))
+    if desconhecidos:
+        parser.error(f"parâmetros desconhecidos: {', '.join(desconhecidos)}")
+
+    # Só as colunas comuns entram na análise: cada período é um bloco do quadro longo
+    por_periodo = {p: base[base['periodo'] == p] for p in periodos()}
+    por_periodo[TODOS_PERIODOS] = base
+    resultado = calcular(por_periodo, parametros, limites, args.trabalhadores)
+
+    os.makedirs(args.saida, exist_ok=True)
+    caminho_parquet = os.path.join(args.saida, "relatorio.parquet")
+    caminho_html = os.path.join(args.saida, "relatorio.html")
+    resultado.to_parquet(caminho_parquet, index=False)
+
+    rotulos = {p: rotulo_periodo(p) for p in periodos()}
+    rotulos[TODOS_PERIODOS] = "Todos os períodos"
+    gerado_em = datetime.datetime.now().isoformat(sep=" ", timespec="seconds")
+    observacoes = [
+        f"Gerado em {gerado_em}, versão dos dados {versao_dados()}.",
+        f"Testes ao nível de {SIGNIFICANCIA:.0%}; a conformidade é testada contra "
+        f"H0: proporção conforme = {PROPORCAO_ESPERADA:.0%}.",
+        f"Todas as {len(resultado):,} combinações (período × estação × parâmetro) estão em relatorio.parquet.",
+    ]
+    with open(caminho_html, "w", encoding="utf-8") as f:
+        f.write(gerar_html(resultado, rotulos, observacoes=observacoes))
+
+    print(f"{len(resultado):,} combinações ({len(por_periodo)} períodos, {len(parametros)} parâmetros) "
+          f"em {time.perf_counter() - inicio:.1f} s")
+    print(f"  {os.path.relpath(caminho_parquet)}\n  {os.path.relpath(caminho_html)}")
+
+
+if __name__ == "__main__":
+    main()
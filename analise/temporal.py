@@ -0,0 +1,130 @@
+"""Séries temporais por estação: reamostragem e janelas móveis.
+
+As colunas numéricas de um período são indexadas uma única vez por
+(estação, data de amostragem) e ordenadas; a ordem por data de todas as
+estações fica guardada como um vetor de posições. Depois disso, a série de
+uma estação é uma fatia do índice e a de todas as estações é um take, sem
+converter datas nem reordenar a cada reexecução. As médias mensais,
+trimestrais e anuais de todas as colunas ficam em cache por período.
+
+A reamostragem não passa pelo groupby do pandas com pd.Grouper, que monta
+o produto estações × intervalos: cada amostra recebe um código inteiro de
+intervalo (meses desde o ano 0, divididos pelo tamanho do intervalo) e as
+somas e contagens saem de np.bincount, só nos pares (estação, intervalo)
+que têm amostras.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from analise.dados import COLUNA_DATA, dados_periodo
+from analise.instrumentacao import medido
+
+# Granularidade -> início do intervalo no pandas
+GRANULARIDADES = {'Mensal': 'MS', 'Trimestral': 'QS', 'Anual': 'YS'}
+
+# Granularidade -> meses por intervalo (intervalos alinhados a janeiro)
+MESES_INTERVALO = {'Mensal': 1, 'Trimestral': 3, 'Anual': 12}
+AMOSTRAS = 'Amostras'
+
+# Estação que representa a média de todas
+TODAS_ESTACOES = 'Todas'
+
+ESTATISTICAS_MOVEIS = ('media', 'mediana')
+
+
+class SeriesTemporais:
+    """Colunas numéricas de um período indexadas por (estação, data)"""
+
+    def __init__(self, df):
+        indice = pd.MultiIndex.from_arrays([df['estação'], df[COLUNA_DATA]], names=['estação', 'data'])
+        self.dados = df.select_dtypes(include='number').set_axis(indice).sort_index()
+        self.ordem_data = np.argsort(self.dados.index.get_level_values('data'), kind='stable')
+        self.estacoes = list(self.dados.index.get_level_values('estação').unique())
+
+    def amostras(self, coluna, estacao=TODAS_ESTACOES):
+        """Valores de cada amostra em ordem de data (sem os ausentes)"""
+        if estacao == TODAS_ESTACOES:
+            serie = self.dados[coluna].iloc[self.ordem_data].droplevel('estação')
+        else:
+            serie = self.dados[coluna].xs(estacao, level='estação')
+        return serie.dropna()
+
+    def _medias(self, codigos, n):
+        """Média de cada coluna por código (ignora ausentes); colunas inteiras viram float64"""
+        medias = {}
+        for coluna, valores in self.dados.items():
+            valores = valores.to_numpy()
+            presente = ~np.isnan(valores)
+            soma = np.bincount(codigos, weights=np.where(presente, valores, 0), minlength=n)
+            contagem = np.bincount(codigos, weights=presente, minlength=n)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                medias[coluna] = (soma / contagem).astype(valores.dtype if valores.dtype.kind == 'f' else float)
+        return medias
+
+    def reamostrar(self, granularidade):
+        """Médias de todas as colunas por intervalo: (por estação, todas as estações).
+
+        Por estação, só os intervalos com amostras; no geral, todos os
+        intervalos entre a primeira e a última amostra (os vazios com NaN).
+        """
+        meses = MESES_INTERVALO[granularidade]
+        datas = self.dados.index.get_level_values('data')
+        intervalos = (datas.year.to_numpy() * 12 + datas.month.to_numpy() - 1) // meses
+        inicial = intervalos.min()
+        intervalos = intervalos - inicial
+        n_intervalos = int(intervalos.max()) + 1
+        # Início de cada intervalo, na mesma unidade das datas
+        inicio_mes = (np.arange(n_intervalos) + inicial) * meses
+        inicios = pd.DatetimeIndex(pd.to_datetime({'year': inicio_mes // 12, 'month': inicio_mes % 12 + 1, 'day': 1})
+                                   .astype(datas.dtype), freq=GRANULARIDADES[granularidade], name='data')
+
+        # Só os pares (estação, intervalo) com amostras, já na ordem do índice
+        pares, codigos = np.unique(self.dados.index.codes[0].astype(np.int64) * n_intervalos + intervalos,
+                                   return_inverse=True)
+        estacao = self.dados.index.levels[0].take(pares // n_intervalos)
+        if isinstance(estacao, pd.CategoricalIndex):
+            estacao = estacao.remove_unused_categories()
+        indice = pd.MultiIndex.from_arrays([estacao, inicios[pares % n_intervalos]], names=['estação', 'data'])
+        por_estacao = pd.DataFrame(self._medias(codigos, len(pares)), index=indice)
+        geral = pd.DataFrame(self._medias(intervalos, n_intervalos), index=inicios)
+        return por_estacao, geral
+
+
+@st.cache_resource(max_entries=8, show_spinner="Indexando as séries por estação e data...")
+def series_temporais(periodo):
+    """SeriesTemporais de um período, em cache (as partições não mudam)"""
+    return SeriesTemporais(dados_periodo(periodo))
+
+
+@st.cache_resource(max_entries=24)
+def _reamostrado(periodo, granularidade):
+    return series_temporais(periodo).reamostrar(granularidade)
+
+
+@medido("dados")
+def serie(periodo, coluna, granularidade=AMOSTRAS, estacao=TODAS_ESTACOES):
+    """Série de uma coluna indexada pela data, nas amostras ou reamostrada.
+
+    Nas séries reamostradas os intervalos sem amostras ficam como NaN, para
+    que as janelas móveis contem tempo e não pontos.
+    """
+    if granularidade == AMOSTRAS:
+        return series_temporais(periodo).amostras(coluna, estacao)
+    por_estacao, geral = _reamostrado(periodo, granularidade)
+    if estacao == TODAS_ESTACOES:
+        return geral[coluna]
+    valores = por_estacao[coluna].xs(estacao, level='estação')
+    return valores.asfreq(GRANULARIDADES[granularidade])
+
+
+def janela_movel(serie, janela, estatistica='media'):
+    """Média ou mediana móvel de `janela` pontos (ignora ausentes).
+
+    A média é atualizada a cada ponto em O(1) (O(n) na série toda); a mediana
+    usa a skiplist do pandas, O(log janela) por ponto.
+    """
+    if estatistica not in ESTATISTICAS_MOVEIS:
+        raise ValueError(f"Estatística desconhecida: {estatistica}")
+    movel = serie.rolling(janela, min_periods=1)
+    return movel.mean() if estatistica == 'media' else movel.median()
@@ -0,0 +1,78 @@
+"""Modelos de previsão da turbidez compartilhados entre sessões.
+
+Cada interação com um widget reexecuta a página inteira. Para que mexer em
+controles que nada têm a ver com a regressão não provoque novos ajustes, os
+modelos ajustados e os vetores derivados (previsões, bandas, valores
+ajustados, ano de cruzamento) ficam em um cache LRU de tamanho limitado,
+compartilhado entre as sessões e indexado por (versão dos dados, tipo de
+modelo, grau). O scikit-learn só é importado ao ajustar um modelo, ou seja,
+quando a previsão não está no cache.
+"""
+import numpy as np
+import streamlit as st
+
+from analise.dados import amostras
+from analise.instrumentacao import medido
+from analise.modelos import bandas_previsao, cruzamento_limite
+
+# Quantos modelos ajustados manter; os usados há mais tempo saem primeiro
+TAMANHO_CACHE_MODELOS = 16
+
+# Grade de anos para a previsão
+ANOS_FUTUROS = np.arange(2019, 2031, 0.1).reshape(-1, 1)
+
+# Padrão "excelente" de turbidez (NTU)
+LIMITE_EXCELENTE = 5
+
+
+def criar_modelo(tipo, grau=1):
+    """Modelo ainda não ajustado: 'linear' ou 'polinomial' de um dado grau.
+
+    O polinomial padroniza o ano antes das potências: com anos brutos
+    (~2020²) a matriz fica tão mal condicionada que o LinearRegression não
+    chega à solução de mínimos quadrados.
+    """
+    from sklearn.linear_model import LinearRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+    if tipo == "linear":
+        return LinearRegression()
+    return make_pipeline(StandardScaler(), PolynomialFeatures(degree=grau), LinearRegression())
+
+
+def ajustar_turbidez(df, tipo, grau=1):
+    """Ajusta o modelo da turbidez ao longo do tempo em df e calcula os derivados"""
+    df_modelo = df[['ano_decimal', 'turbidez']].dropna()
+    X = df_modelo[['ano_decimal']].to_numpy(dtype=float)
+    y = df_modelo['turbidez'].to_numpy(dtype=float)
+
+    modelo = criar_modelo(tipo, grau).fit(X, y)
+    previsoes, inferior, superior, ajustados = bandas_previsao(modelo, X, y, ANOS_FUTUROS)
+    ano, ano_inferior, ano_superior = cruzamento_limite(
+        modelo, X, y, limite=LIMITE_EXCELENTE, inicio=ANOS_FUTUROS[0, 0], fim=2031)
+
+    return {
+        'modelo': modelo,
+        'y': y,
+        'ajustados': ajustados,
+        'anos_futuros': ANOS_FUTUROS,
+        'previsoes': previsoes,
+        'ic_inferior': inferior,
+        'ic_superior': superior,
+        'ano_excelente': float(ano),
+        'ano_excelente_inferior': float(ano_inferior),
+        'ano_excelente_superior': float(ano_superior)
+    }
+
+
+@medido("modelo")
+@st.cache_resource(max_entries=TAMANHO_CACHE_MODELOS, show_spinner="Ajustando o modelo...")
+def previsao_turbidez(versao, tipo, grau=1):
+    """ajustar_turbidez() de todas as amostras.
+
+    versao (de analise.dados.versao_dados) só entra na chave do cache: dados
+    novos geram uma entrada nova. O resultado é compartilhado entre sessões
+    e não deve ser modificado.
+    """
+    return ajustar_turbidez(amostras(), tipo, grau)
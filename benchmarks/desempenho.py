@@ -0,0 +1,292 @@
+"""Tempo e pico de memória dos caminhos mais pesados da análise.
+
+Os casos rodam sem servidor, nas planilhas reais de dados/ (escala 1) e em
+versões sintéticas ampliadas: a escala k repete as amostras reais k vezes,
+cada cópia com estações próprias (RD001-2, RD001-3, ...) e os valores
+multiplicados por um ruído pequeno. A leitura das planilhas só roda na
+escala 1; os demais casos recebem o quadro já em memória.
+
+O tempo é a mediana de algumas repetições, depois de uma chamada de
+aquecimento; o pico de memória (tracemalloc,
+acima do que já estava alocado) sai de uma execução à parte, para não
+pesar no tempo. Cada execução acrescenta linhas ao arquivo de resultados,
+que guarda o commit e a máquina; --comparar mostra a razão para a execução
+anterior do mesmo caso e escala.
+
+Uso:
+    python benchmarks/desempenho.py [--escalas 1 10 100] [--casos ...] [--repeticoes 3]
+                                    [--saida benchmarks/resultados.csv] [--comparar]
+A escala 1000 (~45 milhões de linhas) precisa de alguns GB de memória.
+"""
+import argparse
+import csv
+import datetime
+import gc
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+SAIDA_PADRAO = os.path.join(RAIZ, "benchmarks", "resultados.csv")
+ESCALAS_PADRAO = (1, 10, 100)
+SEMENTE = 2025
+
+# Réplicas do caso de bootstrap (o custo cresce com linhas × réplicas)
+REPLICAS_BOOTSTRAP = 200
+
+# Acima disso uma repetição basta
+SEGUNDOS_REPETICAO_UNICA = 10.0
+
+# Razão de tempo a partir da qual --comparar aponta uma possível regressão
+LIMIAR_REGRESSAO = 1.2
+
+CAMPOS = ["execucao", "commit", "maquina", "python", "caso", "escala", "linhas", "estacoes",
+          "repeticoes", "tempo_mediano_s", "tempo_minimo_s", "pico_memoria_mb"]
+
+
+def sintetico(base, fator, semente=SEMENTE):
+    """Amostras repetidas `fator` vezes, com estações novas a cada cópia"""
+    if fator == 1:
+        return base
+    rng = np.random.default_rng(semente)
+    colunas = {}
+    for nome, coluna in base.items():
+        if nome == 'estação':
+            estacoes = coluna.astype('category')
+            categorias = [f"{e}-{i}" if i else str(e) for i in range(fator) for e in estacoes.cat.categories]
+            codigos = estacoes.cat.codes.to_numpy()
+            deslocamento = np.repeat(np.arange(fator) * len(estacoes.cat.categories), len(base))
+            colunas[nome] = pd.Categorical.from_codes(np.tile(codigos, fator) + deslocamento, categorias)
+        elif pd.api.types.is_float_dtype(coluna) and nome != 'ano_decimal':
+            valores = np.tile(coluna.to_numpy(), fator)
+            ruido = rng.lognormal(0, 0.05, len(valores)).astype(valores.dtype)
+            colunas[nome] = valores * ruido
+        else:
+            colunas[nome] = np.tile(coluna.to_numpy(), fator)
+    return pd.DataFrame(colunas)
+
+
+# --- casos: cada um recebe o quadro de amostras e roda o caminho medido ---
+
+def _carga_planilhas(_):
+    from analise.dados import COLUNA_DATA, _planilhas_monitoramento
+    from analise.ingestao import ler_em_blocos
+
+    for caminho in _planilhas_monitoramento():
+        pd.concat(ler_em_blocos(caminho, coluna_data=COLUNA_DATA), ignore_index=True)
+
+
+def _carga_parquet(_):
+    from analise.dados import COLUNA_DATA, _planilhas_monitoramento
+    from analise.ingestao import ler_planilha
+
+    for caminho in _planilhas_monitoramento():
+        ler_planilha(caminho, coluna_data=COLUNA_DATA)
+
+
+def _agregados(df):
+    from analise.agregados import QUANTIS, agregar
+    from analise.dados import _colunas_numericas
+
+    agregar(df, 'estação', _colunas_numericas(df), QUANTIS)
+
+
+def _momentos(df):
+    from analise.momentos import momentos
+
+    momentos(df)
+
+
+def _correlacao(df):
+    from analise.correlacao import estatisticas_pares, pearson
+
+    pearson(estatisticas_pares(df.select_dtypes(include='number').drop(columns='ano_decimal')))
+
+
+def _previsao(df):
+    from analise.turbidez import ajustar_turbidez
+
+    ajustar_turbidez(df, 'linear')
+
+
+def _modelos_estacao(df):
+    from analise.modelos import ajustar_por_estacao
+
+    ajustar_por_estacao(df)
+
+
+def _teste_t(df):
+    from analise.agregados import agregar, resumir, somar, teste_t
+    from analise.comparacao import ESTACOES_INTERESSE
+
+    # Mesmo caminho da página de estudo: agregados por estação, somados por grupo
+    solidos = agregar(df, 'estação', ['sólidos totais']).loc['sólidos totais']
+    interesse = solidos.index.isin(ESTACOES_INTERESSE)
+    teste_t(resumir(somar(solidos[interesse])), resumir(somar(solidos[~interesse])))
+
+
+def _conformidade(df):
+    from analise.conformidade import TurbidezOrdenada, avaliar
+
+    avaliar(TurbidezOrdenada(df).conformidade(np.arange(1.0, 20.5, 0.5), por=('ano',)))
+
+
+def _bootstrap(df):
+    from analise.bootstrap import replicas_bootstrap
+
+    replicas_bootstrap('media', df['sólidos totais'].dropna().to_numpy(dtype=float), replicas=REPLICAS_BOOTSTRAP)
+
+
+def _temporal(df):
+    from analise.temporal import GRANULARIDADES, SeriesTemporais
+
+    series = SeriesTemporais(df)
+    for granularidade in GRANULARIDADES:
+        series.reamostrar(granularidade)
+
+
+# nome -> (função, só nos dados reais)
+CASOS = {
+    'carga_planilhas': (_carga_planilhas, True),
+    'carga_parquet': (_carga_parquet, True),
+    'agregados_estacao': (_agregados, False),
+    'momentos': (_momentos, False),
+    'correlacao_pearson': (_correlacao, False),
+    'previsao_turbidez': (_previsao, False),
+    'modelos_estacao': (_modelos_estacao, False),
+    'teste_t': (_teste_t, False),
+    'conformidade_binomial': (_conformidade, False),
+    'bootstrap_media': (_bootstrap, False),
+    'series_temporais': (_temporal, False),
+}
+
+
+def medir(funcao, df, repeticoes, memoria=True):
+    """(tempos em s, pico de memória em MB ou None) de funcao(df)"""
+    def cronometrar():
+        gc.collect()
+        inicio = time.perf_counter()
+        funcao(df)
+        return time.perf_counter() - inicio
+
+    # A primeira chamada paga importações (scipy, sklearn) e aquecimentos; só
+    # conta quando já é tão longa que repetir não compensa
+    aquecimento = cronometrar()
+    if aquecimento > SEGUNDOS_REPETICAO_UNICA:
+        tempos = [aquecimento]
+    else:
+        tempos = [cronometrar() for _ in range(repeticoes)]
+
+    pico = None
+    if memoria:
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        funcao(df)
+        pico = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+        tracemalloc.stop()
+    return tempos, pico
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def _anteriores(caminho, execucao):
+    """Última medição anterior de cada (caso, escala) no arquivo de resultados"""
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, newline="", encoding="utf-8") as f:
+        linhas = [l for l in csv.DictReader(f) if l["execucao"] != execucao]
+    return {(l["caso"], int(l["escala"])): l for l in linhas}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS_PADRAO))
+    parser.add_argument("--casos", nargs="+", choices=list(CASOS), default=list(CASOS))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória")
+    parser.add_argument("--saida", default=SAIDA_PADRAO, help="arquivo CSV de resultados (acrescenta)")
+    parser.add_argument("--comparar", action="store_true", help="compara com a execução anterior")
+    args = parser.parse_args(argv)
+
+    os.chdir(RAIZ)
+    from streamlit.logger import set_log_level
+
+    # Sem servidor, o cache do Streamlit avisa a cada chamada que não há sessão
+    set_log_level("error")
+    from analise.dados import amostras
+
+    # Lê (ou traz do cache) as planilhas antes de medir qualquer caso
+    base = amostras()
+    execucao = datetime.datetime.now().isoformat(timespec="seconds")
+    anteriores = _anteriores(args.saida, execucao) if args.comparar else {}
+    contexto = {"execucao": execucao, "commit": _commit(),
+                "maquina": f"{platform.node()} ({os.cpu_count()} CPUs)", "python": platform.python_version()}
+
+    registros = []
+    for escala in args.escalas:
+        casos = [c for c in args.casos if escala == 1 or not CASOS[c][1]]
+        if not casos:
+            continue
+        df = sintetico(base, escala)
+        print(f"\n== escala {escala}: {len(df):,} linhas, {df['estação'].nunique():,} estações")
+        for caso in casos:
+            tempos, pico = medir(CASOS[caso][0], df, args.repeticoes, memoria=not args.sem_memoria)
+            registro = dict(contexto, caso=caso, escala=escala, linhas=len(df), estacoes=df['estação'].nunique(),
+                            repeticoes=len(tempos), tempo_mediano_s=f"{statistics.median(tempos):.6f}",
+                            tempo_minimo_s=f"{min(tempos):.6f}",
+                            pico_memoria_mb="" if pico is None else f"{pico:.1f}")
+            registros.append(registro)
+
+            linha = f"  {caso:24s} {statistics.median(tempos) * 1000:10.1f} ms"
+            if pico is not None:
+                linha += f" {pico:9.1f} MB"
+            anterior = anteriores.get((caso, escala))
+            if anterior:
+                razao = statistics.median(tempos) / float(anterior["tempo_mediano_s"])
+                linha += f"   {razao:5.2f}× vs {anterior['commit'] or anterior['execucao']}"
+                if razao > LIMIAR_REGRESSAO:
+                    linha += "  <- regressão?"
+            print(linha)
+        del df
+        gc.collect()
+
+    # Escalonamento: tempo por linha relativo à menor escala medida de cada caso
+    por_caso = {}
+    for r in registros:
+        por_caso.setdefault(r["caso"], []).append(r)
+    escalonados = {c: rs for c, rs in por_caso.items() if len(rs) > 1}
+    if escalonados:
+        print("\n== escalonamento (tempo por linha relativo à menor escala; 1 = linear)")
+        for caso, rs in escalonados.items():
+            referencia = float(rs[0]["tempo_mediano_s"]) / rs[0]["linhas"]
+            relativos = "  ".join(f"{r['escala']}×: {float(r['tempo_mediano_s']) / r['linhas'] / referencia:5.2f}"
+                                  for r in rs[1:])
+            print(f"  {caso:24s} {relativos}")
+
+    novo = not os.path.exists(args.saida)
+    with open(args.saida, "a", newline="", encoding="utf-8") as f:
+        escritor = csv.DictWriter(f, fieldnames=CAMPOS)
+        if novo:
+            escritor.writeheader()
+        escritor.writerows(registros)
+    print(f"\nResultados acrescentados a {os.path.relpath(args.saida)}")
+
+
+if __name__ == "__main__":
+    main()
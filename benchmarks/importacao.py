@@ -0,0 +1,111 @@
+"""Relatório do tempo de importação de cada módulo, por página.
+
+Cada página roda em um processo novo com ``python -X importtime``, pelo
+executor de testes do Streamlit (sem servidor). O próprio Streamlit é
+importado antes de um marcador; só as importações feitas depois dele, ao
+executar a página, entram no relatório.
+
+Uso:
+    python benchmarks/importacao.py [páginas...] [--top N] [--saida arquivo.csv]
+"""
+import argparse
+import csv
+import glob
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MARCADOR = "inicio-da-pagina"
+
+_EXECUTOR = f"""
+import sys
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=600)
+sys.stderr.write("import time: {MARCADOR}\\n")
+sys.stderr.flush()
+app.run()
+"""
+
+
+def paginas_padrao():
+    """Página inicial e páginas da pasta pages/"""
+    return ["home.py"] + sorted(os.path.relpath(p, RAIZ) for p in glob.glob(os.path.join(RAIZ, "pages", "*.py")))
+
+
+def _importacoes(saida_erro):
+    """(módulo, profundidade, próprio µs, acumulado µs) das linhas após o marcador"""
+    linhas = saida_erro.splitlines()
+    inicio = next(i for i, l in enumerate(linhas) if l == f"import time: {MARCADOR}") + 1
+    registros = []
+    for linha in linhas[inicio:]:
+        if not linha.startswith("import time:"):
+            continue
+        partes = linha[len("import time:"):].split("|")
+        if len(partes) != 3 or not partes[0].strip().isdigit():
+            continue
+        nome = partes[2][1:]
+        profundidade = (len(nome) - len(nome.lstrip())) // 2
+        registros.append((nome.strip(), profundidade, int(partes[0]), int(partes[1])))
+    return registros
+
+
+def medir_pagina(pagina):
+    """Importações de primeiro nível feitas ao executar a página.
+
+    Retorna uma lista de dicionários (modulo, pacote, proprio_ms,
+    acumulado_ms), do mais caro ao mais barato.
+    """
+    ambiente = dict(os.environ, PYTHONPATH=RAIZ)
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _EXECUTOR, os.path.join(RAIZ, pagina)],
+        cwd=RAIZ, env=ambiente, capture_output=True, text=True
+    )
+    if MARCADOR not in processo.stderr:
+        raise RuntimeError(f"Falha ao executar {pagina}:\n{processo.stderr[-2000:]}")
+    # Só o primeiro nível: o acumulado já inclui as dependências
+    return sorted(
+        ({"modulo": nome, "pacote": nome.split(".")[0],
+          "proprio_ms": proprio / 1000, "acumulado_ms": acumulado / 1000}
+         for nome, profundidade, proprio, acumulado in _importacoes(processo.stderr) if profundidade == 0),
+        key=lambda r: r["acumulado_ms"], reverse=True
+    )
+
+
+def _imprimir(pagina, registros, top):
+    total = sum(r["acumulado_ms"] for r in registros)
+    print(f"\n== {pagina}: {total:.0f} ms em {len(registros)} importações de primeiro nível")
+    pacotes = {}
+    for r in registros:
+        pacotes[r["pacote"]] = pacotes.get(r["pacote"], 0.0) + r["acumulado_ms"]
+    print("  por pacote:")
+    for pacote, ms in sorted(pacotes.items(), key=lambda p: p[1], reverse=True)[:top]:
+        print(f"    {ms:9.1f} ms  {pacote}")
+    print("  por módulo:")
+    for r in registros[:top]:
+        print(f"    {r['acumulado_ms']:9.1f} ms  {r['modulo']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paginas", nargs="*", help="caminhos relativos à raiz (padrão: todas)")
+    parser.add_argument("--top", type=int, default=15, help="linhas por tabela")
+    parser.add_argument("--saida", help="grava todas as importações em CSV")
+    args = parser.parse_args(argv)
+
+    linhas_csv = []
+    for pagina in args.paginas or paginas_padrao():
+        registros = medir_pagina(pagina)
+        _imprimir(pagina, registros, args.top)
+        linhas_csv += [dict(r, pagina=pagina) for r in registros]
+
+    if args.saida:
+        with open(args.saida, "w", newline="", encoding="utf-8") as f:
+            escritor = csv.DictWriter(f, fieldnames=["pagina", "modulo", "pacote", "proprio_ms", "acumulado_ms"])
+            escritor.writeheader()
+            escritor.writerows(linhas_csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 
+from analise.imagens import mostrar_imagem
+
 # Configuração da página
 st.set_page_config(
     page_title="Mariana - Análise Ambiental",
@@ -98,9 +100,9 @@ with col1:
     """, unsafe_allow_html=True)
 
 with col2:
-    st.image("assets/imagem1.jpg", 
-             caption="Vista aérea do rompimento da barragem de Fundão - Fonte: IBAMA (2015)", 
-             use_container_width=True)
+    mostrar_imagem("assets/imagem1.jpg",
+                   caption="Vista aérea do rompimento da barragem de Fundão - Fonte: IBAMA (2015)",
+                   fracao_largura=0.4)
     st.markdown("""
 <div style="; padding: 15px; border-radius: 10px; margin-top: 10px;">
 <strong>📌 Destaque:</strong> A lama de rejeitos levou apenas 
@@ -189,7 +191,7 @@ st.markdown('<h2 class="section-title">Sobre a Tragédia</h2>', unsafe_allow_htm
 
 col1, col2 = st.columns([2, 3])
 with col1:
-    st.image("assets/imagem2.png", caption="Localização da barragem de Fundão e área afetada", use_container_width=True)
+    mostrar_imagem("assets/imagem2.png", caption="Localização da barragem de Fundão e área afetada", fracao_largura=0.4)
 
 with col2:
     st.markdown("""
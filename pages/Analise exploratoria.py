@@ -1,9 +1,16 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import os
-import numpy as np
-from scipy import stats
+
+from analise.agregados import por_estacao
+from analise.correlacao import TODOS, correlacao, filtrar_significativas, ordem_agrupada
+from analise.dados import atualizar, cubo_agregados, dados_periodo, periodos, relatorio_memoria, rotulo_periodo
+from analise.graficos import mostrar_figura, reduzir_serie, usar_webgl
+from analise.instrumentacao import iniciar, medido, painel
+from analise.momentos import COLUNAS_DESCRITIVAS, momentos_periodo
+from analise.temporal import AMOSTRAS, GRANULARIDADES, TODAS_ESTACOES, janela_movel, serie, series_temporais
+
+# Acima desse número de variáveis a matriz de correlação não traz os valores escritos
+LIMITE_ANOTACAO = 15
 
 # Configuração da página
 st.set_page_config(
@@ -12,6 +19,7 @@ st.set_page_config(
     page_icon="💧",
     initial_sidebar_state="expanded"
 )
+iniciar("analise_exploratoria")
 
 # CSS personalizado
 st.markdown("""
@@ -61,6 +69,10 @@ with st.sidebar:
     st.markdown("- 2020 (1º Semestre)")
     st.markdown("- 2020 (2º Semestre)")
     st.markdown("- 2021")
+
+    memoria = relatorio_memoria().loc['total']
+    st.caption(f"Memória dos dados: {memoria['bytes_depois'] / 2**20:.1f} MB "
+               f"(sem tipos compactos: {memoria['bytes_antes'] / 2**20:.1f} MB)")
     
     st.divider()
     st.markdown("Desenvolvido por:")
@@ -71,31 +83,6 @@ with st.sidebar:
     st.markdown("Equipe de Análise de Dados Ambientais")
     st.markdown("Última atualização: Maio 2025")
 
-# Função para carregar os dados
-@st.cache_data
-def carregar_dados():
-    arquivos = {
-        "2019": "dados/seriehistorica2019.xlsx",
-        "2020 - 1º Semestre": "dados/primeirosemestre2020.xlsx",
-        "2020 - 2º Semestre": "dados/segundosemestre2020.xlsx",
-        "2021": "dados/ano2021.xlsx"
-    }
-
-    dados = {}
-    for nome, caminho in arquivos.items():
-        ext = os.path.splitext(caminho)[1]
-        if ext == ".xls":
-            dados[nome] = pd.read_excel(caminho, engine='xlrd')
-        else:
-            dados[nome] = pd.read_excel(caminho)
-    return dados
-
-def analise_descritiva(df, coluna):
-    desc = df[coluna].describe().to_frame().T
-    desc['skewness'] = stats.skew(df[coluna].dropna())
-    desc['kurtosis'] = stats.kurtosis(df[coluna].dropna())
-    return desc
-
 # Conteúdo principal
 st.markdown('<h1 class="header-text">📊 Análise Exploratória de Dados de Qualidade da Água</h1>', unsafe_allow_html=True)
 
@@ -116,144 +103,211 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-dados = carregar_dados()
-periodo = st.selectbox("Escolha o período:", list(dados.keys()))
-df = dados[periodo]
+atualizar()
+periodo = st.selectbox("Escolha o período:", periodos(), format_func=rotulo_periodo)
+df = dados_periodo(periodo)
 
-# Seção de estatísticas descritivas
-st.markdown('<a name="estatisticas-descritivas"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">📈 Estatísticas Descritivas</h2>', unsafe_allow_html=True)
+colunas_numericas = df.select_dtypes(include="number").columns.tolist()
 
-colunas_numericas = df.select_dtypes(include=["float64", "int64"]).columns.tolist()
+# Cada seção é um fragmento: interagir com um controle reexecuta só a seção
+# a que ele pertence, com as entradas recebidas como parâmetros.
+
+@st.fragment
+@medido("secao")
+def secao_descritiva(periodo, colunas_numericas):
+    """Resumo descritivo e teste de normalidade de uma variável"""
+    # Todas as variáveis do período saem de uma única passada, em cache
+    momentos = momentos_periodo(periodo)
+
+    # Seção de estatísticas descritivas
+    st.markdown('<a name="estatisticas-descritivas"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">📈 Estatísticas Descritivas</h2>', unsafe_allow_html=True)
+
+    if colunas_numericas:
+        col_selecionada = st.selectbox("Selecione uma variável para análise:", colunas_numericas)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            desc = momentos.loc[[col_selecionada], COLUNAS_DESCRITIVAS]
+            st.dataframe(desc.style.background_gradient(cmap='Blues'))
+
+        with col2:
+            # Teste de normalidade
+            p_value = momentos.at[col_selecionada, 'p_normalidade']
+            st.metric("Teste de Normalidade (p-value)", f"{p_value:.4f}",
+                     help="p-value < 0.05 indica que os dados não seguem uma distribuição normal")
+            st.markdown("""
+            <div class="feature-card">
+                <h4>Interpretação:</h4>
+                <ul>
+                    <li><strong>Média/Mediana:</strong> Tendência central dos dados</li>
+                    <li><strong>Desvio Padrão:</strong> Dispersão dos valores</li>
+                    <li><strong>Skewness:</strong> Assimetria da distribuição</li>
+                    <li><strong>Kurtosis:</strong> "Achatamento" da distribuição</li>
+                </ul>
+            </div>
+            """, unsafe_allow_html=True)
+
+
+@st.fragment
+@medido("secao")
+def secao_correlacao(periodo, colunas_numericas):
+    """Matriz de correlação entre as variáveis numéricas"""
+    # Matriz de correlação
+    st.markdown('<a name="matriz-de-correlacao"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">🔗 Matriz de Correlação</h2>', unsafe_allow_html=True)
+
+    if len(colunas_numericas) > 1:
+        col1, col2, col3 = st.columns(3)
+        metodo = col1.radio("Método:", ["Pearson", "Spearman"], horizontal=True)
+        visao = col2.radio("Visão:", ["Completa", "Só significativas", "Agrupada"], horizontal=True)
+        todos = col3.checkbox("Todos os períodos (colunas comuns)")
+
+        # Matriz em cache por (período, método); a de todos os períodos soma as partições
+        corr_matrix, pares = correlacao(TODOS if todos else periodo, metodo.lower())
+        if visao == "Só significativas":
+            minimo = st.slider("|r| mínimo:", min_value=0.0, max_value=0.9, value=0.3, step=0.05)
+            corr_matrix = filtrar_significativas(corr_matrix, pares, minimo=minimo)
+        elif visao == "Agrupada":
+            ordem = ordem_agrupada(corr_matrix)
+            corr_matrix = corr_matrix.loc[ordem, ordem]
+
+        if corr_matrix.empty:
+            st.info("Nenhuma correlação atende aos critérios escolhidos.")
+        else:
+            # Anota os valores só quando a matriz é pequena o bastante para lê-los
+            fig_corr = px.imshow(corr_matrix, text_auto='.2f' if len(corr_matrix) <= LIMITE_ANOTACAO else False,
+                                aspect="auto", zmin=-1, zmax=1,
+                                title=f"Correlação entre Variáveis ({metodo})",
+                                color_continuous_scale='RdBu')
+            mostrar_figura(fig_corr, use_container_width=True)
+            st.caption(f"Cada par usa as linhas em que as duas variáveis estão presentes "
+                       f"(entre {int(pares.to_numpy().min())} e {int(pares.to_numpy().max())} amostras).")
 
-if colunas_numericas:
-    col_selecionada = st.selectbox("Selecione uma variável para análise:", colunas_numericas)
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.dataframe(analise_descritiva(df, col_selecionada).style.background_gradient(cmap='Blues'))
-    
-    with col2:
-        # Teste de normalidade
-        _, p_value = stats.normaltest(df[col_selecionada].dropna())
-        st.metric("Teste de Normalidade (p-value)", f"{p_value:.4f}",
-                 help="p-value < 0.05 indica que os dados não seguem uma distribuição normal")
         st.markdown("""
         <div class="feature-card">
-            <h4>Interpretação:</h4>
+            <h4>Como interpretar a matriz:</h4>
             <ul>
-                <li><strong>Média/Mediana:</strong> Tendência central dos dados</li>
-                <li><strong>Desvio Padrão:</strong> Dispersão dos valores</li>
-                <li><strong>Skewness:</strong> Assimetria da distribuição</li>
-                <li><strong>Kurtosis:</strong> "Achatamento" da distribuição</li>
+                <li><strong>Valores próximos de 1:</strong> Forte correlação positiva</li>
+                <li><strong>Valores próximos de -1:</strong> Forte correlação negativa</li>
+                <li><strong>Valores próximos de 0:</strong> Pouca ou nenhuma correlação</li>
             </ul>
         </div>
         """, unsafe_allow_html=True)
 
-# Matriz de correlação
-st.markdown('<a name="matriz-de-correlacao"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">🔗 Matriz de Correlação</h2>', unsafe_allow_html=True)
 
-if len(colunas_numericas) > 1:
-    corr_matrix = df[colunas_numericas].corr(numeric_only=True)
-    fig_corr = px.imshow(corr_matrix, text_auto=True, aspect="auto",
-                        title="Correlação entre Variáveis",
-                        color_continuous_scale='Blues')
-    st.plotly_chart(fig_corr, use_container_width=True)
-    
-    st.markdown("""
-    <div class="feature-card">
-        <h4>Como interpretar a matriz:</h4>
-        <ul>
-            <li><strong>Valores próximos de 1:</strong> Forte correlação positiva</li>
-            <li><strong>Valores próximos de -1:</strong> Forte correlação negativa</li>
-            <li><strong>Valores próximos de 0:</strong> Pouca ou nenhuma correlação</li>
-        </ul>
-    </div>
-    """, unsafe_allow_html=True)
-
-# Gráficos de distribuição
-st.markdown('<a name="distribuicao-dos-dados"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">📊 Distribuição dos Dados</h2>', unsafe_allow_html=True)
-
-if colunas_numericas:
-    col_dist = st.selectbox("Selecione variável para distribuição:", colunas_numericas, key='dist')
-    
-    tab1, tab2 = st.tabs(["Histograma", "Boxplot"])
-    with tab1:
-        fig_hist = px.histogram(df, x=col_dist, nbins=30, 
-                              title=f"Distribuição de {col_dist}",
-                              color_discrete_sequence=['#3498db'])
-        st.plotly_chart(fig_hist, use_container_width=True)
-    
-    with tab2:
-        fig_box = px.box(df, y=col_dist, title=f"Boxplot de {col_dist}",
-                        color_discrete_sequence=['#3498db'])
-        st.plotly_chart(fig_box, use_container_width=True)
-
-# Seção de análise temporal
-st.markdown('<a name="analise-temporal"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">⏳ Análise Temporal</h2>', unsafe_allow_html=True)
-
-# Tentar detectar coluna de tempo
-possiveis_colunas_tempo = [col for col in df.columns if "data" in col.lower() or "ano" in col.lower() or "mês" in col.lower() or "mes" in col.lower()]
-coluna_tempo = None
-
-if possiveis_colunas_tempo:
-    coluna_tempo = st.selectbox("Coluna de tempo detectada:", possiveis_colunas_tempo)
-    # Converter para datetime se possível
-    try:
-        df[coluna_tempo] = pd.to_datetime(df[coluna_tempo])
-        df = df.sort_values(by=coluna_tempo)
-    except Exception as e:
-        st.warning(f"Não foi possível converter {coluna_tempo} para datetime: {e}")
-        coluna_tempo = None
-
-# Gráfico com eixo do tempo fixo
-if coluna_tempo:
-    colunas_numericas = df.select_dtypes(include=["float64", "int64"]).columns.tolist()
+@st.fragment
+@medido("secao")
+def secao_distribuicao(df, colunas_numericas):
+    """Histograma e boxplot de uma variável"""
+    # Gráficos de distribuição
+    st.markdown('<a name="distribuicao-dos-dados"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">📊 Distribuição dos Dados</h2>', unsafe_allow_html=True)
+
     if colunas_numericas:
-        col_y = st.selectbox("Escolha a variável a ser analisada:", colunas_numericas, key="y")
+        col_dist = st.selectbox("Selecione variável para distribuição:", colunas_numericas, key='dist')
 
-        fig = px.line(df, x=coluna_tempo, y=col_y, title=f"{col_y} ao longo do tempo",
-                     color_discrete_sequence=['#3498db'])
-        st.plotly_chart(fig, use_container_width=True)
-    else:
+        tab1, tab2 = st.tabs(["Histograma", "Boxplot"])
+        with tab1:
+            fig_hist = px.histogram(df, x=col_dist, nbins=30, 
+                                  title=f"Distribuição de {col_dist}",
+                                  color_discrete_sequence=['#3498db'])
+            mostrar_figura(fig_hist, use_container_width=True)
+
+        with tab2:
+            fig_box = px.box(df, y=col_dist, title=f"Boxplot de {col_dist}",
+                            color_discrete_sequence=['#3498db'])
+            mostrar_figura(fig_box, use_container_width=True)
+
+
+@st.fragment
+@medido("secao")
+def secao_temporal(periodo):
+    """Evolução de uma variável ao longo do tempo"""
+    # Seção de análise temporal
+    st.markdown('<a name="analise-temporal"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">⏳ Análise Temporal</h2>', unsafe_allow_html=True)
+
+    # Séries indexadas uma vez por (estação, data de amostragem), em cache por período
+    series = series_temporais(periodo)
+    colunas_numericas = series.dados.columns.tolist()
+    if not colunas_numericas:
         st.warning("Não há colunas numéricas disponíveis para análise gráfica.")
-else:
-    st.info("Nenhuma coluna de tempo foi detectada automaticamente. Verifique se há colunas como 'Data', 'Ano', 'Mês', etc.")
+        return
 
-# Seção de análise por estação
-st.markdown('<a name="analise-por-estacao"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">🏞️ Análise por Estação de Monitoramento</h2>', unsafe_allow_html=True)
+    col_y = st.selectbox("Escolha a variável a ser analisada:", colunas_numericas, key="y")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        granularidade = st.radio("Granularidade:", [AMOSTRAS, *GRANULARIDADES], index=1, horizontal=True)
+    with col2:
+        estacao = st.selectbox("Estação:", [TODAS_ESTACOES, *series.estacoes], key="estacao_temporal")
+    with col3:
+        tipo_movel = st.selectbox("Janela móvel:", ["Nenhuma", "Média", "Mediana"])
+    if tipo_movel != "Nenhuma":
+        janela = st.slider("Tamanho da janela (pontos):", min_value=2, max_value=60, value=12)
 
-if 'Estação' in df.columns:
-    colunas_numericas = df.select_dtypes(include=["float64", "int64"]).columns.tolist()
+    valores = serie(periodo, col_y, granularidade, estacao)
+    if valores.dropna().empty:
+        st.info("Sem valores dessa variável para a estação escolhida.")
+        return
 
-    if colunas_numericas:
-        col_variavel = st.selectbox("Escolha a variável para análise por estação:", colunas_numericas, key="por_estacao")
+    titulo = f"{col_y} ao longo do tempo" + ("" if estacao == TODAS_ESTACOES else f" — {estacao}")
+    if granularidade != AMOSTRAS:
+        titulo += f" (média {granularidade.lower()})"
+    # Reduz a série no servidor (LTTB) antes de enviá-la ao navegador
+    pontos = valores.dropna()
+    pontos = pontos.iloc[reduzir_serie(pontos.index, pontos)]
+    fig = px.line(x=pontos.index, y=pontos.to_numpy(), title=titulo,
+                 labels={'x': 'data de amostragem', 'y': col_y},
+                 render_mode='webgl' if usar_webgl(len(pontos)) else 'auto',
+                 color_discrete_sequence=['#3498db'])
+
+    if tipo_movel != "Nenhuma":
+        movel = janela_movel(valores, janela, 'media' if tipo_movel == "Média" else 'mediana').dropna()
+        movel = movel.iloc[reduzir_serie(movel.index, movel)]
+        fig.add_scatter(x=movel.index, y=movel.to_numpy(), mode='lines', name=f"{tipo_movel} móvel ({janela})",
+                        line=dict(color='#e74c3c'))
+    mostrar_figura(fig, use_container_width=True)
+
+
+@st.fragment
+@medido("secao")
+def secao_estacao(df, periodo):
+    """Agregados de uma variável por estação, lidos do cubo do período"""
+    # Seção de análise por estação
+    st.markdown('<a name="analise-por-estacao"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">🏞️ Análise por Estação de Monitoramento</h2>', unsafe_allow_html=True)
+
+    if 'estação' in df.columns:
+        colunas_numericas = df.select_dtypes(include="number").columns.tolist()
+
+        if colunas_numericas:
+            col_variavel = st.selectbox("Escolha a variável para análise por estação:", colunas_numericas, key="por_estacao")
 
-        tipo_agregacao = st.radio("Tipo de agregação:", ["Média", "Soma", "Máximo", "Mínimo"], horizontal=True)
+            tipo_agregacao = st.radio("Tipo de agregação:", ["Média", "Soma", "Máximo", "Mínimo"], horizontal=True)
 
-        if tipo_agregacao == "Média":
-            df_agg = df.groupby("Estação")[col_variavel].mean().sort_values(ascending=False)
-        elif tipo_agregacao == "Soma":
-            df_agg = df.groupby("Estação")[col_variavel].sum().sort_values(ascending=False)
-        elif tipo_agregacao == "Máximo":
-            df_agg = df.groupby("Estação")[col_variavel].max().sort_values(ascending=False)
+            # Consulta ao cubo de agregados do período (calculado uma vez por partição)
+            estatisticas = {"Média": "media", "Soma": "soma", "Máximo": "maximo", "Mínimo": "minimo"}
+            df_agg = por_estacao(cubo_agregados(periodo), col_variavel, estatisticas[tipo_agregacao])
+            df_agg = df_agg.sort_values(ascending=False)
+
+            fig2 = px.bar(df_agg, x=df_agg.index, y=df_agg.values,
+                         labels={"x": "Estação", "y": col_variavel},
+                         title=f"{tipo_agregacao} de {col_variavel} por Estação",
+                         color=df_agg.values,
+                         color_continuous_scale='Blues')
+            mostrar_figura(fig2, use_container_width=True)
         else:
-            df_agg = df.groupby("Estação")[col_variavel].min().sort_values(ascending=False)
-
-        fig2 = px.bar(df_agg, x=df_agg.index, y=df_agg.values,
-                     labels={"x": "Estação", "y": col_variavel},
-                     title=f"{tipo_agregacao} de {col_variavel} por Estação",
-                     color=df_agg.values,
-                     color_continuous_scale='Blues')
-        st.plotly_chart(fig2, use_container_width=True)
+            st.warning("Nenhuma coluna numérica disponível para análise por estação.")
     else:
-        st.warning("Nenhuma coluna numérica disponível para análise por estação.")
-else:
-    st.warning("Coluna 'Estação' não encontrada nos dados.")
+        st.warning("Coluna 'estação' não encontrada nos dados.")
+
+
+secao_descritiva(periodo, colunas_numericas)
+secao_correlacao(periodo, colunas_numericas)
+secao_distribuicao(df, colunas_numericas)
+secao_temporal(periodo)
+secao_estacao(df, periodo)
 
 # Rodapé
 st.divider()
@@ -262,4 +316,6 @@ st.markdown("""
     Este projeto foi desenvolvido para fins acadêmicos e de pesquisa.<br>
     Dados coletados de fontes oficiais entre 2019-2021.<br>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+painel()
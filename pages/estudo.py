@@ -3,11 +3,20 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.pipeline import make_pipeline
-from scipy.stats import t, binomtest
-from scipy import stats
+
+from analise.agregados import intervalo_confianca, resumir, somar, teste_t, teste_t_referencia
+from analise.comparacao import ESTACOES_INTERESSE, bootstrap_estacoes
+from analise.conformidade import PROPORCAO_ESPERADA, conformidade
+from analise.dados import agregados_por_estacao, amostras, atualizar, versao_dados
+from analise.graficos import mostrar_figura, reduzir_serie, usar_webgl
+from analise.imagens import mostrar_imagem
+from analise.instrumentacao import iniciar, medido, painel
+from analise.iqa import CLASSES_IQA, iqa_amostras
+from analise.modelos import ajustar_por_estacao
+from analise.turbidez import LIMITE_EXCELENTE, previsao_turbidez
+
+# Limites do slider de conformidade, avaliados de uma vez na curva
+LIMITES_CURVA = np.arange(1.0, 20.5, 0.5)
 
 # Configuração da página
 st.set_page_config(
@@ -16,6 +25,7 @@ st.set_page_config(
     page_icon="💧",
     initial_sidebar_state="expanded"
 )
+iniciar("estudo")
 
 # CSS personalizado
 st.markdown("""
@@ -72,6 +82,7 @@ with st.sidebar:
     st.markdown("- [Diagnóstico do Modelo](#diagnostico-modelo)")
     st.markdown("- [Análise Binomial](#analise-binomial)")
     st.markdown("- [Correlação entre Variáveis](#correlacao-variaveis)")
+    st.markdown("- [Turbidez por Classe de IQA](#turbidez-iqa)")
     st.markdown("- [Análise por Estação](#analise-estacao)")
     st.markdown("- [Teste de Hipótese](#teste-hipotese)")
     
@@ -145,403 +156,497 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # === Carregamento dos dados ===
-@st.cache_data
-def carregar_dados():
-    arquivos = {
-        "2019": "dados/seriehistorica2019.xlsx",
-        "1S2020": "dados/primeirosemestre2020.xlsx",
-        "2S2020": "dados/segundosemestre2020.xlsx",
-        "2021": "dados/ano2021.xlsx"
-    }
-    lista_dfs = []
-
-    for nome, caminho in arquivos.items():
-        df = pd.read_excel(caminho)
-        df.columns = df.columns.str.strip().str.lower()
-
-        colunas_interesse = ['data de amostragem', 'turbidez', 'sólidos totais', 'solidos totais','estação']
-        colunas_presentes = [col for col in colunas_interesse if col in df.columns]
-
-        if 'data de amostragem' in colunas_presentes:
-            dados = df[colunas_presentes].copy()
-            dados['data de amostragem'] = pd.to_datetime(dados['data de amostragem'], errors='coerce')
-            dados = dados.dropna(subset=['data de amostragem'])
-            dados['periodo'] = nome
-            lista_dfs.append(dados)
-
-    return pd.concat(lista_dfs, ignore_index=True)
-
-df = carregar_dados()
-
-# Padronizar nome da coluna de sólidos totais
-df = df.rename(columns={'solidos totais': 'sólidos totais'})
+atualizar()
+df = amostras()[['data de amostragem', 'ano_decimal', 'turbidez', 'sólidos totais', 'estação', 'periodo']]
 
 # === Pré-processamento ===
-df = df.sort_values(by='data de amostragem')
-df['ano_decimal'] = df['data de amostragem'].dt.year + (df['data de amostragem'].dt.dayofyear / 365)
+# As partições já chegam ordenadas; só reordena se um período novo se sobrepuser aos anteriores
+if not df['data de amostragem'].is_monotonic_increasing:
+    df = df.sort_values(by='data de amostragem')
 
 # === NOVAS FUNÇÕES ===
-def intervalo_previsao(X, y, modelo, alfa=0.05):
-    """Calcula intervalo de previsão para regressão linear"""
-    pred = modelo.predict(X)
-    n = len(y)
-    mse = np.sum((y - pred) ** 2) / (n - 2)
-    h = np.diag(X @ np.linalg.pinv(X.T @ X) @ X.T)
-    erro = np.sqrt(mse * (1 + h))
-    t_val = t.ppf(1 - alfa/2, n-2)
-    return pred - t_val * erro, pred + t_val * erro
-
 def plot_residuos(y_real, y_pred):
     residuos = y_real - y_pred
-    fig = px.scatter(x=y_pred, y=residuos,
+    # Envia ao navegador só o envelope dos resíduos (mín./máx. por pixel) e os atípicos
+    idx = reduzir_serie(y_pred, residuos, metodo='minmax')
+    fig = px.scatter(x=y_pred[idx], y=residuos[idx],
                     labels={'x': 'Valores Preditos', 'y': 'Resíduos'},
                     title="Análise de Resíduos",
+                    render_mode='webgl' if usar_webgl(len(idx)) else 'auto',
                     color_discrete_sequence=['#3498db'])
     fig.add_hline(y=0, line_dash="dash", line_color="red")
     return fig
 
-# === MODELAGEM AVANÇADA ===
-st.markdown('<a name="modelos-previsao"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">📈 Modelos de Previsão de Turbidez</h2>', unsafe_allow_html=True)
-
-# Seleção do tipo de modelo
-model_type = st.radio("Tipo de Modelo:", 
-                     ["Linear", "Polinomial (Grau 2)"], 
-                     horizontal=True)
-
-# Preparar dados
-df_modelo = df[['ano_decimal', 'turbidez']].dropna()
-X = df_modelo[['ano_decimal']].values
-y = df_modelo['turbidez'].values
-
-# Ajustar modelo selecionado
-if model_type == "Linear":
-    modelo = LinearRegression()
-    modelo.fit(X, y)
-else:
-    # Modelo polinomial
-    modelo = make_pipeline(
-        PolynomialFeatures(degree=2),
-        LinearRegression()
+
+# === SEÇÕES ===
+# Cada seção é um fragmento: interagir com um controle reexecuta só a seção
+# a que ele pertence, com as entradas recebidas como parâmetros.
+
+@st.fragment
+@medido("secao")
+def secao_modelos(df):
+    """Modelos de previsão da turbidez e diagnóstico dos resíduos"""
+    # === MODELAGEM AVANÇADA ===
+    st.markdown('<a name="modelos-previsao"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">📈 Modelos de Previsão de Turbidez</h2>', unsafe_allow_html=True)
+
+    # Seleção do tipo de modelo
+    model_type = st.radio("Tipo de Modelo:", 
+                         ["Linear", "Polinomial (Grau 2)"], 
+                         horizontal=True)
+
+    # Ajustar o modelo selecionado (ou reaproveitá-lo do cache compartilhado)
+    if model_type == "Linear":
+        resultado = previsao_turbidez(versao_dados(), "linear")
+    else:
+        resultado = previsao_turbidez(versao_dados(), "polinomial", grau=2)
+
+    # Previsão para anos futuros, com intervalo de previsão de 95%
+    anos_futuros = resultado['anos_futuros']
+    previsoes, ic_lower, ic_upper = resultado['previsoes'], resultado['ic_inferior'], resultado['ic_superior']
+    y, y_pred = resultado['y'], resultado['ajustados']
+
+    # Criar datas reais para eixo X
+    datas_futuras = pd.to_datetime([f"{int(a)}-01-01" for a in anos_futuros.flatten()])
+
+    # === Gráfico de Previsão ===
+    fig = go.Figure()
+
+    # Pontos reais (reduzidos no servidor à largura do gráfico, mantendo os atípicos)
+    df_pontos = df[['data de amostragem', 'turbidez']].dropna()
+    df_pontos = df_pontos.iloc[reduzir_serie(df_pontos['data de amostragem'], df_pontos['turbidez'], metodo='minmax')]
+    Dispersao = go.Scattergl if usar_webgl(len(df_pontos)) else go.Scatter
+    fig.add_trace(Dispersao(
+        x=df_pontos['data de amostragem'], 
+        y=df_pontos['turbidez'],
+        mode='markers', 
+        name='Amostras', 
+        marker=dict(color='#3498db', size=5)
+    ))
+
+    # Linha de regressão
+    fig.add_trace(go.Scatter(
+        x=datas_futuras, 
+        y=previsoes,
+        mode='lines', 
+        name=f'Tendência ({model_type})', 
+        line=dict(color='#e74c3c')
+    ))
+
+    # Intervalo de confiança
+    fig.add_trace(go.Scatter(
+        x=datas_futuras, 
+        y=ic_lower,
+        fill=None, 
+        mode='lines', 
+        line=dict(width=0),
+        showlegend=False
+    ))
+    fig.add_trace(go.Scatter(
+        x=datas_futuras, 
+        y=ic_upper,
+        fill='tonexty', 
+        mode='lines', 
+        line=dict(width=0),
+        name='Intervalo 95%',
+        fillcolor='rgba(231, 76, 60, 0.2)'
+    ))
+
+    # Linha padrão excelente
+    fig.add_hline(
+        y=5, 
+        line_dash="dash", 
+        line_color="#2ecc71",
+        annotation_text="Padrão Excelente (5 NTU)", 
+        annotation_position="bottom right"
     )
-    modelo.fit(X, y)
-
-# Previsão para anos futuros
-anos_futuros = np.arange(2019, 2031, 0.1).reshape(-1, 1)
-previsoes = modelo.predict(anos_futuros)
-
-# Calcular intervalos de confiança
-if model_type == "Linear":
-    ic_lower, ic_upper = intervalo_previsao(X, y, modelo)
-else:
-    # Para modelo polinomial, usamos um intervalo simplificado
-    ic_lower = previsoes - 1.96 * np.std(y - modelo.predict(X))
-    ic_upper = previsoes + 1.96 * np.std(y - modelo.predict(X))
-
-# Criar datas reais para eixo X
-datas_futuras = pd.to_datetime([f"{int(a)}-01-01" for a in anos_futuros.flatten()])
-
-# === Gráfico de Previsão ===
-fig = go.Figure()
-
-# Pontos reais
-fig.add_trace(go.Scatter(
-    x=df['data de amostragem'], 
-    y=df['turbidez'],
-    mode='markers', 
-    name='Amostras', 
-    marker=dict(color='#3498db', size=5)
-))
-
-# Linha de regressão
-fig.add_trace(go.Scatter(
-    x=datas_futuras, 
-    y=previsoes,
-    mode='lines', 
-    name=f'Tendência ({model_type})', 
-    line=dict(color='#e74c3c')
-))
-
-# Intervalo de confiança
-fig.add_trace(go.Scatter(
-    x=datas_futuras, 
-    y=ic_lower,
-    fill=None, 
-    mode='lines', 
-    line=dict(width=0),
-    showlegend=False
-))
-fig.add_trace(go.Scatter(
-    x=datas_futuras, 
-    y=ic_upper,
-    fill='tonexty', 
-    mode='lines', 
-    line=dict(width=0),
-    name='Intervalo 95%',
-    fillcolor='rgba(231, 76, 60, 0.2)'
-))
-
-# Linha padrão excelente
-fig.add_hline(
-    y=5, 
-    line_dash="dash", 
-    line_color="#2ecc71",
-    annotation_text="Padrão Excelente (5 NTU)", 
-    annotation_position="bottom right"
-)
 
-fig.update_layout(
-    title="Turbidez da Água ao Longo do Tempo",
-    xaxis_title="Data", 
-    yaxis_title="Turbidez (NTU)",
-    height=500,
-    plot_bgcolor='rgba(240, 242, 246, 1)',
-    paper_bgcolor='rgba(240, 242, 246, 1)'
-)
+    fig.update_layout(
+        title="Turbidez da Água ao Longo do Tempo",
+        xaxis_title="Data", 
+        yaxis_title="Turbidez (NTU)",
+        height=500,
+        plot_bgcolor='rgba(240, 242, 246, 1)',
+        paper_bgcolor='rgba(240, 242, 246, 1)'
+    )
 
-st.plotly_chart(fig, use_container_width=True)
+    mostrar_figura(fig, use_container_width=True)
+
+    # === Previsão de retorno à qualidade excelente ===
+    ano_excelente = resultado['ano_excelente']
+    ano_excelente_inf, ano_excelente_sup = resultado['ano_excelente_inferior'], resultado['ano_excelente_superior']
+
+    st.subheader("📈 Previsão com Base na Tendência Atual")
+
+    if not np.isnan(ano_excelente):
+        faixa = ""
+        if not np.isnan(ano_excelente_inf):
+            faixa = f" (IC 95%: {ano_excelente_inf:.1f} a {ano_excelente_sup:.1f})"
+        st.markdown(f"""
+        <div class="success-box">
+            ✅ A análise de regressão {model_type.lower()} prevê que a turbidez pode atingir o padrão excelente (<strong>≤ 5 NTU</strong>) 
+            por volta de <strong>{int(ano_excelente)}</strong>{faixa}.
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown("""
+        <div class="warning-box">
+            ⚠️ A projeção atual indica que os níveis de turbidez podem não atingir o padrão excelente até 2030.
+        </div>
+        """, unsafe_allow_html=True)
+
+    # === ANÁLISE DE RESÍDUOS ===
+    st.markdown('<a name="diagnostico-modelo"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">🔍 Diagnóstico do Modelo</h2>', unsafe_allow_html=True)
+
+    fig_resid = plot_residuos(y, y_pred)
+    mostrar_figura(fig_resid, use_container_width=True)
+
+
+@st.fragment
+@medido("secao")
+def secao_binomial():
+    """Conformidade ao limite de turbidez por ano e teste binomial"""
+    # === ANÁLISE BINOMIAL ===
+    st.markdown('<a name="analise-binomial"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">📊 Análise Binomial de Conformidade</h2>', unsafe_allow_html=True)
+
+    limite_turbidez = st.slider("Limite de Turbidez (NTU) para conformidade:", 
+                               min_value=1.0, max_value=20.0, value=5.0, step=0.5)
+
+    # Contagens por busca binária na turbidez já ordenada por ano e estação
+    conformidade_por_ano = conformidade(limite_turbidez, por=('ano',))
+
+    fig_binom = px.bar(conformidade_por_ano, 
+                      x='ano', 
+                      y='proporcao',
+                      error_y=conformidade_por_ano['ic_superior'] - conformidade_por_ano['proporcao'],
+                      error_y_minus=conformidade_por_ano['proporcao'] - conformidade_por_ano['ic_inferior'],
+                      title=f"Proporção de Amostras Conforme (≤ {limite_turbidez} NTU)",
+                      labels={'proporcao': 'Proporção Conforme', 'ano': 'Ano'},
+                      color_discrete_sequence=['#3498db'])
+    mostrar_figura(fig_binom, use_container_width=True)
+    st.caption("Barras de erro: intervalo exato de Clopper-Pearson (95%).")
+
+    # Curva de conformidade em todos os limites do slider, numa única avaliação
+    curva = conformidade(LIMITES_CURVA, por=())
+    fig_curva = go.Figure([
+        go.Scatter(x=curva['limite'], y=curva['ic_superior'], mode='lines', line=dict(width=0),
+                   showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=curva['limite'], y=curva['ic_inferior'], mode='lines', line=dict(width=0),
+                   fill='tonexty', fillcolor='rgba(52, 152, 219, 0.2)', name='IC 95%'),
+        go.Scatter(x=curva['limite'], y=curva['proporcao'], mode='lines+markers',
+                   line=dict(color='#3498db'), name='Proporção conforme'),
+    ])
+    fig_curva.add_vline(x=limite_turbidez, line_dash='dash', line_color='gray')
+    fig_curva.add_hline(y=PROPORCAO_ESPERADA, line_dash='dot', line_color='red',
+                        annotation_text=f"{PROPORCAO_ESPERADA:.0%}")
+    fig_curva.update_layout(title="Proporção conforme por limite de turbidez (todas as amostras)",
+                            xaxis_title="Limite de Turbidez (NTU)", yaxis_title="Proporção Conforme")
+    mostrar_figura(fig_curva, use_container_width=True)
+
+    # Teste binomial
+    resultado = curva.loc[curva['limite'] == limite_turbidez].iloc[0]
+
+    st.metric("Teste Binomial", 
+             f"p-value = {resultado['p_valor']:.4f}",
+             help="H0: Proporção de amostras conforme = 95%")
+
+
+@st.fragment
+@medido("secao")
+def secao_correlacao(df):
+    """Correlação entre turbidez e sólidos totais"""
+    # === CORRELAÇÃO ENTRE VARIÁVEIS ===
+    st.markdown('<a name="correlacao-variaveis"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">🔗 Correlação entre Turbidez e Sólidos Totais</h2>', unsafe_allow_html=True)
+
+    if 'sólidos totais' in df.columns:
+        df_corr = df[['turbidez', 'sólidos totais']].dropna()
+        fig_corr = px.scatter(
+            df_corr, 
+            x='sólidos totais', 
+            y='turbidez',
+            trendline="ols",
+            title="Relação entre Turbidez e Sólidos Totais",
+            labels={'sólidos totais': 'Sólidos Totais (mg/L)', 'turbidez': 'Turbidez (NTU)'},
+            color_discrete_sequence=['#3498db']
+        )
+        mostrar_figura(fig_corr, use_container_width=True)
+
+        # Calcular coeficiente de correlação
+        corr_coef = np.corrcoef(df_corr['sólidos totais'], df_corr['turbidez'])[0,1]
+        st.metric("Coeficiente de Correlação de Pearson", f"{corr_coef:.2f}")
+
+
+@st.fragment
+@medido("secao")
+def secao_iqa(df):
+    """Distribuição da turbidez em cada classe de IQA do trimestre da amostra"""
+    st.markdown('<a name="turbidez-iqa"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">💧 Turbidez por Classe de IQA</h2>', unsafe_allow_html=True)
+
+    # Junção pronta (posições em cache por versão dos dados), alinhada pelo índice das amostras
+    dados_iqa = df[['turbidez']].join(iqa_amostras()).dropna()
+    quantis = (dados_iqa.groupby('classe_iqa', observed=True)['turbidez']
+               .quantile([0.05, 0.25, 0.5, 0.75, 0.95]).unstack())
+
+    # Caixas desenhadas a partir dos quantis, sem enviar as amostras ao navegador
+    fig_iqa = go.Figure(go.Box(
+        x=quantis.index.astype(str), q1=quantis[0.25], median=quantis[0.5], q3=quantis[0.75],
+        lowerfence=quantis[0.05], upperfence=quantis[0.95],
+        marker=dict(color='#3498db'), name='Turbidez'
+    ))
+    fig_iqa.update_layout(
+        title="Turbidez por Classe de IQA (bigodes: percentis 5 e 95)",
+        xaxis_title="Classe de IQA",
+        yaxis_title="Turbidez (NTU)",
+        xaxis=dict(categoryorder='array', categoryarray=CLASSES_IQA),
+        height=500,
+        plot_bgcolor='rgba(240, 242, 246, 1)',
+        paper_bgcolor='rgba(240, 242, 246, 1)'
+    )
+    mostrar_figura(fig_iqa, use_container_width=True)
+    st.caption(f"{len(dados_iqa)} amostras com IQA do trimestre (IQA disponível para 2020, por trimestre, e 2021, anual).")
 
-# === Previsão de retorno à qualidade excelente ===
-ano_excelente = None
-for ano, pred in zip(anos_futuros.flatten(), previsoes):
-    if pred <= 5:
-        ano_excelente = ano
-        break
 
-st.subheader("📈 Previsão com Base na Tendência Atual")
+@st.fragment
+@medido("secao")
+def secao_estacao(df):
+    """Comparação das estações de interesse com as demais"""
+    # === ANÁLISE POR ESTAÇÃO ===
+    st.markdown('<a name="analise-estacao"></a>', unsafe_allow_html=True)
+    st.markdown('<h2 class="section-title">🏞️ Análise por Estação de Monitoramento</h2>', unsafe_allow_html=True)
 
-if ano_excelente:
-    st.markdown(f"""
-    <div class="success-box">
-        ✅ A análise de regressão {model_type.lower()} prevê que a turbidez pode atingir o padrão excelente (<strong>≤ 5 NTU</strong>) 
-        por volta de <strong>{int(ano_excelente)}</strong>.
-    </div>
-    """, unsafe_allow_html=True)
-else:
+    st.header("Mapa das estações de coleta")
+    mostrar_imagem('assets/download.png', caption="Localização das estações de monitoramento")
     st.markdown("""
-    <div class="warning-box">
-        ⚠️ A projeção atual indica que os níveis de turbidez podem não atingir o padrão excelente até 2030.
+    <div class="feature-card">
+        <p>Declararemos as estações RD074, RD075 e RD009 como estações de interesse para o nosso estudo, devido a sua proximidade a barragem rompida.</p>
     </div>
     """, unsafe_allow_html=True)
 
-# === ANÁLISE DE RESÍDUOS ===
-st.markdown('<a name="diagnostico-modelo"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">🔍 Diagnóstico do Modelo</h2>', unsafe_allow_html=True)
-
-y_pred = modelo.predict(X)
-fig_resid = plot_residuos(y, y_pred)
-st.plotly_chart(fig_resid, use_container_width=True)
-
-# === ANÁLISE BINOMIAL ===
-st.markdown('<a name="analise-binomial"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">📊 Análise Binomial de Conformidade</h2>', unsafe_allow_html=True)
-
-limite_turbidez = st.slider("Limite de Turbidez (NTU) para conformidade:", 
-                           min_value=1.0, max_value=20.0, value=5.0, step=0.5)
-
-df['conforme'] = df['turbidez'] <= limite_turbidez
-conformidade_por_ano = df.groupby(df['data de amostragem'].dt.year)['conforme'].mean().reset_index()
-
-fig_binom = px.bar(conformidade_por_ano, 
-                  x='data de amostragem', 
-                  y='conforme',
-                  title=f"Proporção de Amostras Conforme (≤ {limite_turbidez} NTU)",
-                  labels={'conforme': 'Proporção Conforme', 'data de amostragem': 'Ano'},
-                  color_discrete_sequence=['#3498db'])
-st.plotly_chart(fig_binom, use_container_width=True)
-
-# Teste binomial
-total_amostras = len(df['conforme'].dropna())
-amostras_conformes = sum(df['conforme'].dropna())
-result = binomtest(amostras_conformes, total_amostras, 0.95)  # H0: p=95% de conformidade
-
-st.metric("Teste Binomial", 
-         f"p-value = {result.pvalue:.4f}",
-         help="H0: Proporção de amostras conforme = 95%")
-
-# === CORRELAÇÃO ENTRE VARIÁVEIS ===
-st.markdown('<a name="correlacao-variaveis"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">🔗 Correlação entre Turbidez e Sólidos Totais</h2>', unsafe_allow_html=True)
-
-if 'sólidos totais' in df.columns:
-    df_corr = df[['turbidez', 'sólidos totais']].dropna()
-    fig_corr = px.scatter(
-        df_corr, 
-        x='sólidos totais', 
-        y='turbidez',
-        trendline="ols",
-        title="Relação entre Turbidez e Sólidos Totais",
-        labels={'sólidos totais': 'Sólidos Totais (mg/L)', 'turbidez': 'Turbidez (NTU)'},
-        color_discrete_sequence=['#3498db']
+    # Filtrar os dados para as estações de interesse e as demais
+    estacoes_interesse = list(ESTACOES_INTERESSE)
+    df_estacoes_interesse = df[df['estação'].isin(estacoes_interesse)]
+    df_outros = df[~df['estação'].isin(estacoes_interesse)]
+
+    # Gráfico para comparar sólidos totais nas estações de interesse com as demais
+    st.markdown('<h3 class="section-title">📊 Comparação dos Sólidos Totais nas Estações RD074, RD075, RD009 com as Demais</h3>', unsafe_allow_html=True)
+
+    # Criar o gráfico
+    fig_comparacao = go.Figure()
+
+    # Estações de interesse
+    fig_comparacao.add_trace(go.Box(
+        y=df_estacoes_interesse['sólidos totais'],
+        x=df_estacoes_interesse['estação'],
+        name='Estações de Interesse (RD074, RD075, RD009)',
+        boxmean='sd',
+        marker=dict(color='#e67e22')
+    ))
+
+    # Outras estações
+    fig_comparacao.add_trace(go.Box(
+        y=df_outros['sólidos totais'],
+        x=df_outros['estação'],
+        name='Outras Estações',
+        boxmean='sd',
+        marker=dict(color='#3498db')
+    ))
+
+    fig_comparacao.update_layout(
+        title="Distribuição dos Sólidos Totais por Estação",
+        xaxis_title="Estação",
+        yaxis_title="Sólidos Totais (mg/L)",
+        height=500,
+        plot_bgcolor='rgba(240, 242, 246, 1)',
+        paper_bgcolor='rgba(240, 242, 246, 1)'
     )
-    st.plotly_chart(fig_corr, use_container_width=True)
-    
-    # Calcular coeficiente de correlação
-    corr_coef = np.corrcoef(df_corr['sólidos totais'], df_corr['turbidez'])[0,1]
-    st.metric("Coeficiente de Correlação de Pearson", f"{corr_coef:.2f}")
-
-# === ANÁLISE POR ESTAÇÃO ===
-st.markdown('<a name="analise-estacao"></a>', unsafe_allow_html=True)
-st.markdown('<h2 class="section-title">🏞️ Análise por Estação de Monitoramento</h2>', unsafe_allow_html=True)
-
-st.header("Mapa das estações de coleta")
-st.image('assets/download.png', caption="Localização das estações de monitoramento")
-st.markdown("""
-<div class="feature-card">
-    <p>Declararemos as estações RD074, RD075 e RD009 como estações de interesse para o nosso estudo, devido a sua proximidade a barragem rompida.</p>
-</div>
-""", unsafe_allow_html=True)
-
-# Filtrar os dados para as estações de interesse e as demais
-estacoes_interesse = ['RD074', 'RD075', 'RD009']
-df_estacoes_interesse = df[df['estação'].isin(estacoes_interesse)]
-df_outros = df[~df['estação'].isin(estacoes_interesse)]
-
-# Gráfico para comparar sólidos totais nas estações de interesse com as demais
-st.markdown('<h3 class="section-title">📊 Comparação dos Sólidos Totais nas Estações RD074, RD075, RD009 com as Demais</h3>', unsafe_allow_html=True)
-
-# Criar o gráfico
-fig_comparacao = go.Figure()
-
-# Estações de interesse
-fig_comparacao.add_trace(go.Box(
-    y=df_estacoes_interesse['sólidos totais'],
-    x=df_estacoes_interesse['estação'],
-    name='Estações de Interesse (RD074, RD075, RD009)',
-    boxmean='sd',
-    marker=dict(color='#e67e22')
-))
-
-# Outras estações
-fig_comparacao.add_trace(go.Box(
-    y=df_outros['sólidos totais'],
-    x=df_outros['estação'],
-    name='Outras Estações',
-    boxmean='sd',
-    marker=dict(color='#3498db')
-))
-
-fig_comparacao.update_layout(
-    title="Distribuição dos Sólidos Totais por Estação",
-    xaxis_title="Estação",
-    yaxis_title="Sólidos Totais (mg/L)",
-    height=500,
-    plot_bgcolor='rgba(240, 242, 246, 1)',
-    paper_bgcolor='rgba(240, 242, 246, 1)'
-)
-
-st.plotly_chart(fig_comparacao, use_container_width=True)
-
-# === Análise estatística (Intervalos de Confiança e Teste T) ===
-def intervalo_confianca(data, confidence=0.95):
-    n = len(data)
-    mean = np.mean(data)
-    sem = stats.sem(data)
-    margin_of_error = sem * t.ppf((1 + confidence) / 2., n-1)
-    return mean - margin_of_error, mean + margin_of_error, mean
-
-# Intervalo de confiança para as estações de interesse
-ic_interesse_lower, ic_interesse_upper, mean_interesse = intervalo_confianca(df_estacoes_interesse['sólidos totais'])
 
-# Intervalo de confiança para as outras estações
-ic_outros_lower, ic_outros_upper, mean_outros = intervalo_confianca(df_outros['sólidos totais'])
+    mostrar_figura(fig_comparacao, use_container_width=True)
+
+    # === Tendência da turbidez por estação (todas ajustadas de uma vez) ===
+    st.markdown('<h3 class="section-title">📉 Tendência da Turbidez por Estação</h3>', unsafe_allow_html=True)
+
+    tendencias = ajustar_por_estacao(df, limite=5).rename(columns={
+        'estação': 'Estação',
+        'n': 'Amostras',
+        'inclinacao': 'Inclinação (NTU/ano)',
+        'intercepto': 'Intercepto',
+        'ic_inclinacao_inferior': 'IC 95% inferior',
+        'ic_inclinacao_superior': 'IC 95% superior',
+        'p_valor': 'Valor p',
+        'r2': 'R²',
+        'situacao_limite': 'Situação (5 NTU)',
+        'ano_limite': 'Ano ≤ 5 NTU',
+        'ano_limite_inferior': 'Ano ≤ 5 NTU (IC inferior)',
+        'ano_limite_superior': 'Ano ≤ 5 NTU (IC superior)'
+    })
+
+    st.dataframe(tendencias[tendencias['Estação'].isin(estacoes_interesse)], use_container_width=True, hide_index=True)
+    with st.expander("Ver todas as estações"):
+        st.dataframe(tendencias, use_container_width=True, hide_index=True)
+
+    # === Análise estatística (Intervalos de Confiança e Teste T) ===
+    # Resumos (n, média, desvio) montados a partir dos agregados por estação, sem varrer as amostras
+    solidos_por_estacao = agregados_por_estacao().loc['sólidos totais']
+    eh_interesse = solidos_por_estacao.index.isin(estacoes_interesse)
+    resumo_interesse = resumir(somar(solidos_por_estacao[eh_interesse]))
+    resumo_outros = resumir(somar(solidos_por_estacao[~eh_interesse]))
+
+    # Intervalo de confiança para as estações de interesse
+    ic_interesse_lower, ic_interesse_upper, mean_interesse = intervalo_confianca(resumo_interesse)
+
+    # Intervalo de confiança para as outras estações
+    ic_outros_lower, ic_outros_upper, mean_outros = intervalo_confianca(resumo_outros)
+
+    # Exibir intervalos de confiança
+    st.subheader("📊 Intervalo de Confiança para a Média de Sólidos Totais")
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("""
+        <div class="feature-card">
+            <h4>Estacões de Interesse (RD074, RD075, RD009):</h4>
+            <p>Média: {:.2f} mg/L</p>
+            <p>Intervalo de Confiança (95%): ({:.2f}, {:.2f}) mg/L</p>
+        </div>
+        """.format(mean_interesse, ic_interesse_lower, ic_interesse_upper), unsafe_allow_html=True)
+
+    with col2:
+        st.markdown("""
+        <div class="feature-card">
+            <h4>Outras Estações:</h4>
+            <p>Média: {:.2f} mg/L</p>
+            <p>Intervalo de Confiança (95%): ({:.2f}, {:.2f}) mg/L</p>
+        </div>
+        """.format(mean_outros, ic_outros_lower, ic_outros_upper), unsafe_allow_html=True)
+
+    # Teste t para comparação de médias
+    t_stat, p_value = teste_t(resumo_interesse, resumo_outros)
+
+    st.subheader("🔬 Teste T para Comparação de Médias")
+    st.metric("Estatística t", f"{t_stat:.2f}")
+    st.metric("Valor p", f"{p_value:.4f}")
+
+    if p_value < 0.05:
+        st.markdown("""
+        <div class="success-box">
+            📉 Existe uma diferença estatisticamente significativa entre os sólidos totais das estações de interesse (RD074, RD075, RD009) e as demais.
+        </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown("""
+        <div class="warning-box">
+            📈 Não existe uma diferença estatisticamente significativa entre os sólidos totais das estações de interesse e as demais.
+        </div>
+        """, unsafe_allow_html=True)
 
-# Exibir intervalos de confiança
-st.subheader("📊 Intervalo de Confiança para a Média de Sólidos Totais")
-col1, col2 = st.columns(2)
-
-with col1:
     st.markdown("""
     <div class="feature-card">
-        <h4>Estacões de Interesse (RD074, RD075, RD009):</h4>
-        <p>Média: {:.2f} mg/L</p>
-        <p>Intervalo de Confiança (95%): ({:.2f}, {:.2f}) mg/L</p>
+        <p>Nota-se que, atuando com um intervalo de confiança de 95%, as médias dos sólidos totais presentes nas amostras coletadas pelas estações de interesse ainda são quase metade dos valores comparáveis coletados nas demais estações.</p>
+        <p>Isso pode evidenciar uma maior preocupação com a remoção dos dejetos no local de rompimento da barragem.</p>
     </div>
-    """.format(mean_interesse, ic_interesse_lower, ic_interesse_upper), unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
 
-with col2:
-    st.markdown("""
-    <div class="feature-card">
-        <h4>Outras Estações:</h4>
-        <p>Média: {:.2f} mg/L</p>
-        <p>Intervalo de Confiança (95%): ({:.2f}, {:.2f}) mg/L</p>
-    </div>
-    """.format(mean_outros, ic_outros_lower, ic_outros_upper), unsafe_allow_html=True)
 
-# Teste t para comparação de médias
-t_stat, p_value = stats.ttest_ind(df_estacoes_interesse['sólidos totais'].dropna(), df_outros['sólidos totais'].dropna())
+@st.fragment
+@medido("secao")
+def secao_bootstrap():
+    """Intervalos bootstrap, sem suposição de normalidade, para as comparações entre estações"""
+    st.subheader("🎲 Intervalos Bootstrap")
+    st.markdown("""
+    Os intervalos acima supõem normalidade. O bootstrap reamostra as próprias amostras e
+    não depende dessa suposição (intervalos percentis de 95%).
+    """)
+    if not st.toggle("Calcular intervalos bootstrap (10.000 reamostragens)"):
+        return
+
+    resultado = bootstrap_estacoes(versao_dados())
+    inf_i, sup_i, media_i = resultado['media_interesse']
+    inf_o, sup_o, media_o = resultado['media_outros']
+    inf_d, sup_d, dif = resultado['diferenca']
+
+    cols = st.columns(3)
+    cols[0].metric("Média (interesse)", f"{media_i:.2f} mg/L", help=f"IC 95%: ({inf_i:.2f}, {sup_i:.2f}) mg/L")
+    cols[1].metric("Média (demais)", f"{media_o:.2f} mg/L", help=f"IC 95%: ({inf_o:.2f}, {sup_o:.2f}) mg/L")
+    cols[2].metric("Diferença", f"{dif:.2f} mg/L", help=f"IC 95%: ({inf_d:.2f}, {sup_d:.2f}) mg/L")
+    st.write(f"IC 95% da diferença entre as médias: ({inf_d:.2f}, {sup_d:.2f}) mg/L — "
+             f"{'não inclui' if inf_d > 0 or sup_d < 0 else 'inclui'} o zero.")
+
+    st.dataframe(resultado['tendencias'].rename(columns={
+        'estação': 'Estação',
+        'n': 'Amostras',
+        'inclinacao': 'Inclinação (NTU/ano)',
+        'inclinacao_inferior': 'IC 95% inferior',
+        'inclinacao_superior': 'IC 95% superior',
+        'ano_limite': 'Ano ≤ 5 NTU',
+        'ano_limite_inferior': 'Ano ≤ 5 NTU (IC inferior)',
+        'ano_limite_superior': 'Ano ≤ 5 NTU (IC superior)'
+    }), use_container_width=True, hide_index=True)
+
+
+@st.fragment
+@medido("secao")
+def secao_teste_hipotese():
+    """Teste t unicaudal da turbidez média contra o padrão excelente"""
+    # Âncora e título da seção
+    st.markdown('<a name="teste-hipotese"></a>', unsafe_allow_html=True)
+    st.header("🔬 Teste de Hipótese: Turbidez > Padrão Excelente")
+
+    # Hipóteses com container destacado
+    with st.container():
+        st.subheader("Formulação das Hipóteses")
+        st.markdown("""
+        **H₀ (Hipótese Nula):** A turbidez média é igual a 5 NTU (padrão excelente)  
+        **H₁ (Hipótese Alternativa):** A turbidez média é maior que 5 NTU  
+        *Teste unicaudal à direita com α = 0.05*
+        """)
+        st.markdown("---")
+
+    # Realizar o teste t a partir do resumo da turbidez (n, média, desvio)
+    resumo_turbidez = resumir(somar(agregados_por_estacao().loc['turbidez']))
+    t_stat, p_value = teste_t_referencia(resumo_turbidez, LIMITE_EXCELENTE)
+    ic_lower, ic_upper, media_turbidez = intervalo_confianca(resumo_turbidez)
+
+    # Métricas em colunas
+    cols = st.columns(3)
+    cols[0].metric("Média Observada", f"{media_turbidez:.2f} NTU")
+    cols[1].metric("Estatística t", f"{t_stat:.3f}")
+    cols[2].metric("Valor p", f"{p_value:.4f}")
+
+    # Intervalo de Confiança
+    st.subheader("Intervalo de Confiança 95%")
+    st.write(f"{ic_lower:.2f} NTU ≤ μ ≤ {ic_upper:.2f} NTU")
+
+    # Conclusão do teste
+    st.subheader("Ponderação e Conclusão")
+    st.write("**Análise do valor-p:**")
+    st.markdown(f"""
+    - O valor-p obtido ({p_value:.4f}) é {'menor' if p_value < 0.05 else 'maior'} que o nível de significância α = 0.05
+    - Isso indica que há {'evidências suficientes' if p_value < 0.05 else 'evidências insuficientes'} para rejeitar a hipótese nula
+    """)
 
-st.subheader("🔬 Teste T para Comparação de Médias")
-st.metric("Estatística t", f"{t_stat:.2f}")
-st.metric("Valor p", f"{p_value:.4f}")
+    st.write("**Interpretação prática:**")
+    st.markdown(f"""
+    - A turbidez média observada ({media_turbidez:.2f} NTU) está {'significativamente acima' if p_value < 0.05 else 'dentro do esperado'} do padrão excelente (5 NTU)
+    - O intervalo de confiança não inclui o valor de referência (5 NTU), reforçando a {'presença' if p_value < 0.05 else 'ausência'} de impacto significativo
+    """)
 
-if p_value < 0.05:
-    st.markdown("""
-    <div class="success-box">
-        📉 Existe uma diferença estatisticamente significativa entre os sólidos totais das estações de interesse (RD074, RD075, RD009) e as demais.
-    </div>
-    """, unsafe_allow_html=True)
-else:
-    st.markdown("""
-    <div class="warning-box">
-        📈 Não existe uma diferença estatisticamente significativa entre os sólidos totais das estações de interesse e as demais.
-    </div>
-    """, unsafe_allow_html=True)
+    # Caixa de conclusão condicional
+    if p_value < 0.05:
+        st.success(f"**Conclusão final:** Rejeitamos H₀ - há evidências estatísticas de que a turbidez permanece acima do padrão excelente.")
+    else:
+        st.warning(f"**Conclusão final:** Não rejeitamos H₀ - há evidências insuficientes de que a turbidez permanece acima do padrão excelente.")
 
-st.markdown("""
-<div class="feature-card">
-    <p>Nota-se que, atuando com um intervalo de confiança de 95%, as médias dos sólidos totais presentes nas amostras coletadas pelas estações de interesse ainda são quase metade dos valores comparáveis coletados nas demais estações.</p>
-    <p>Isso pode evidenciar uma maior preocupação com a remoção dos dejetos no local de rompimento da barragem.</p>
-</div>
-""", unsafe_allow_html=True)
 
-# Âncora e título da seção
-st.markdown('<a name="teste-hipotese"></a>', unsafe_allow_html=True)
-st.header("🔬 Teste de Hipótese: Turbidez > Padrão Excelente")
+secao_modelos(df)
+secao_binomial()
+secao_correlacao(df)
+secao_iqa(df)
+secao_estacao(df)
+secao_bootstrap()
+secao_teste_hipotese()
 
-# Hipóteses com container destacado
-with st.container():
-    st.subheader("Formulação das Hipóteses")
-    st.markdown("""
-    **H₀ (Hipótese Nula):** A turbidez média é igual a 5 NTU (padrão excelente)  
-    **H₁ (Hipótese Alternativa):** A turbidez média é maior que 5 NTU  
-    *Teste unicaudal à direita com α = 0.05*
-    """)
-    st.markdown("---")
-
-# Realizar o teste t (cálculos permanecem iguais)
-turbidez_data = df['turbidez'].dropna()
-t_stat, p_value = stats.ttest_1samp(turbidez_data, 5, alternative='greater')
-ic_lower, ic_upper = stats.t.interval(0.95, len(turbidez_data)-1, 
-                   loc=np.mean(turbidez_data), 
-                   scale=stats.sem(turbidez_data))
-
-# Métricas em colunas
-cols = st.columns(3)
-cols[0].metric("Média Observada", f"{np.mean(turbidez_data):.2f} NTU")
-cols[1].metric("Estatística t", f"{t_stat:.3f}")
-cols[2].metric("Valor p", f"{p_value:.4f}")
-
-# Intervalo de Confiança
-st.subheader("Intervalo de Confiança 95%")
-st.write(f"{ic_lower:.2f} NTU ≤ μ ≤ {ic_upper:.2f} NTU")
-
-# Conclusão do teste
-st.subheader("Ponderação e Conclusão")
-st.write("**Análise do valor-p:**")
-st.markdown(f"""
-- O valor-p obtido ({p_value:.4f}) é {'menor' if p_value < 0.05 else 'maior'} que o nível de significância α = 0.05
-- Isso indica que há {'evidências suficientes' if p_value < 0.05 else 'evidências insuficientes'} para rejeitar a hipótese nula
-""")
-
-st.write("**Interpretação prática:**")
-st.markdown(f"""
-- A turbidez média observada ({np.mean(turbidez_data):.2f} NTU) está {'significativamente acima' if p_value < 0.05 else 'dentro do esperado'} do padrão excelente (5 NTU)
-- O intervalo de confiança não inclui o valor de referência (5 NTU), reforçando a {'presença' if p_value < 0.05 else 'ausência'} de impacto significativo
-""")
-
-# Caixa de conclusão condicional
-if p_value < 0.05:
-    st.success(f"**Conclusão final:** Rejeitamos H₀ - há evidências estatísticas de que a turbidez permanece acima do padrão excelente.")
-else:
-    st.warning(f"**Conclusão final:** Não rejeitamos H₀ - há evidências insuficientes de que a turbidez permanece acima do padrão excelente.")
\ No newline at end of file
+painel()
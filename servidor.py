@@ -0,0 +1,49 @@
+"""Entrada da aplicação com cache de longa duração para as imagens.
+
+O Streamlit não envia Cache-Control para os arquivos de static/, e o
+navegador volta a perguntar por eles a cada visita. As variantes das
+imagens (analise/imagens.py) têm o hash do original no nome, então nunca
+mudam: aqui elas ganham "immutable" por um ano.
+
+Uso:
+    streamlit run servidor.py
+(streamlit run home.py continua funcionando, sem os cabeçalhos)
+
+Versões do Streamlit sem st.App (a entrada ASGI) rodam este arquivo como
+um script comum: ele executa home.py, também sem os cabeçalhos.
+"""
+import runpy
+from pathlib import Path
+
+import streamlit as st
+
+# Caminho das variantes, como visto pelo servidor
+PREFIXO_IMAGENS = "/app/static/imagens/"
+CACHE_IMAGENS = "public, max-age=31536000, immutable"
+
+
+class CacheImagens:
+    """Middleware ASGI que acrescenta Cache-Control às respostas das variantes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or PREFIXO_IMAGENS not in scope["path"]:
+            return await self.app(scope, receive, send)
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start" and mensagem["status"] in (200, 304):
+                cabecalhos = [(k, v) for k, v in mensagem.get("headers", []) if k.lower() != b"cache-control"]
+                mensagem = dict(mensagem, headers=cabecalhos + [(b"cache-control", CACHE_IMAGENS.encode())])
+            await send(mensagem)
+
+        return await self.app(scope, receive, enviar)
+
+
+if hasattr(st, "App"):
+    from starlette.middleware import Middleware
+
+    app = st.App("home.py", middleware=[Middleware(CacheImagens)])
+else:
+    runpy.run_path(str(Path(__file__).with_name("home.py")), run_name="__main__")